@@ -0,0 +1,211 @@
+"""Constant-memory aggregates of blackjack results that merge across shards and runs."""
+from collections import Counter
+from cards import valid_cards, card_codes
+
+# Final hand values stay below 32, so fixed-size histograms cover every game
+hand_value_bins = 32
+
+
+class RunningStats:
+    """Count, mean and variance of a stream of numbers, updated in O(1) per value (Welford).
+
+    Two instances merge exactly with the pairwise update of Chan et al., so
+    shards and runs can be summarized separately and combined afterwards.
+    """
+    __slots__ = ('count', 'mean', 'm2')
+
+    def __init__(self, count=0, mean=0.0, m2=0.0):
+        self.count = count
+        self.mean = mean
+        self.m2 = m2
+
+    def add(self, value):
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+
+    def merge(self, other):
+        """Fold `other` into this instance and return it."""
+        if other.count:
+            count = self.count + other.count
+            delta = other.mean - self.mean
+            self.mean += delta * other.count / count
+            self.m2 += other.m2 + delta * delta * self.count * other.count / count
+            self.count = count
+        return self
+
+    @classmethod
+    def from_histogram(cls, histogram):
+        """Exact stats of the values counted in an integer Histogram."""
+        count = histogram.total
+        if not count:
+            return cls()
+        mean = sum(value * n for value, n in enumerate(histogram.counts)) / count
+        m2 = sum(n * (value - mean) ** 2 for value, n in enumerate(histogram.counts))
+        return cls(count, mean, m2)
+
+    @property
+    def variance(self):
+        """Sample variance (0 below two values)."""
+        return self.m2 / (self.count - 1) if self.count > 1 else 0.0
+
+    def to_dict(self):
+        return {"count": self.count, "mean": self.mean, "variance": self.variance}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data["count"], data["mean"], data["variance"] * max(data["count"] - 1, 0))
+
+
+class Histogram:
+    """Counts of the integers 0 .. bins-1 in a fixed list of bins."""
+    __slots__ = ('counts',)
+
+    def __init__(self, bins=hand_value_bins):
+        self.counts = [0] * bins
+
+    def add(self, value, count=1):
+        self.counts[value] += count
+
+    def merge(self, other):
+        """Fold `other` into this histogram and return it."""
+        for value, count in enumerate(other.counts):
+            self.counts[value] += count
+        return self
+
+    @property
+    def total(self):
+        return sum(self.counts)
+
+    def to_dict(self):
+        """Value -> count, dropping empty bins (the results file form)."""
+        return {value: count for value, count in enumerate(self.counts) if count}
+
+    @classmethod
+    def from_dict(cls, counts, bins=hand_value_bins):
+        """Read a value -> count dict back; JSON turns the values into strings."""
+        histogram = cls(bins)
+        for value, count in counts.items():
+            histogram.add(int(value), count)
+        return histogram
+
+
+class CardCounter(Histogram):
+    """Histogram of card ranks, added and written by card name."""
+    __slots__ = ()
+
+    def __init__(self):
+        super().__init__(len(valid_cards))
+
+    def add(self, card, count=1):
+        self.counts[card_codes[card]] += count
+
+    def to_dict(self):
+        return {valid_cards[code]: count for code, count in enumerate(self.counts) if count}
+
+    @classmethod
+    def from_dict(cls, counts):
+        counter = cls()
+        for card, count in counts.items():
+            counter.add(card, count)
+        return counter
+
+
+class GameAggregate:
+    """Everything the results files report about a set of games, in O(1) memory.
+
+    Holds the win record, dealer bust count, player and dealer card counts,
+    final hand value histograms and running mean/variance of the final values.
+    `merge` combines aggregates of shards or separate runs of the same setup.
+    """
+
+    def __init__(self):
+        self.num_games = 0
+        self.win_record = {"Player": 0, "Dealer": 0, "Tie": 0}
+        self.dealer_busts = 0
+        self.player_cards = CardCounter()
+        self.dealer_cards = CardCounter()
+        self.player_values = Histogram()
+        self.dealer_values = Histogram()
+        self.player_value_stats = RunningStats()
+        self.dealer_value_stats = RunningStats()
+
+    def add_game(self, player_hand_value, dealer_hand_value, winner, dealer_busted):
+        """Count one finished game; `winner` is "Player", "Dealer" or "Tie"."""
+        self.num_games += 1
+        self.win_record[winner] += 1
+        if dealer_busted:
+            self.dealer_busts += 1
+        self.player_values.add(player_hand_value)
+        self.dealer_values.add(dealer_hand_value)
+        self.player_value_stats.add(player_hand_value)
+        self.dealer_value_stats.add(dealer_hand_value)
+
+    def merge(self, other):
+        """Fold `other` into this aggregate and return it."""
+        self.num_games += other.num_games
+        for outcome, count in other.win_record.items():
+            self.win_record[outcome] += count
+        self.dealer_busts += other.dealer_busts
+        self.player_cards.merge(other.player_cards)
+        self.dealer_cards.merge(other.dealer_cards)
+        self.player_values.merge(other.player_values)
+        self.dealer_values.merge(other.dealer_values)
+        self.player_value_stats.merge(other.player_value_stats)
+        self.dealer_value_stats.merge(other.dealer_value_stats)
+        return self
+
+    def metrics(self):
+        # Rates over no games are reported as 0 rather than failing
+        games = self.num_games or 1
+        return {
+            "player_win_rate": (self.win_record['Player'] / games) * 100,
+            "dealer_bust_rate": (self.dealer_busts / games) * 100,
+            "average_player_hand_value": self.player_value_stats.mean,
+            "average_dealer_hand_value": self.dealer_value_stats.mean,
+        }
+
+    def to_results(self, player_final_hand_values=None, dealer_final_hand_values=None):
+        """The aggregate's part of a results file.
+
+        Final hand values are written as value -> count histograms; the
+        per-game lists are only included when they are passed in.
+        """
+        results = {
+            "player_card_frequencies": self.player_cards.to_dict(),
+            "dealer_card_frequencies": self.dealer_cards.to_dict(),
+            "player_final_hand_value_counts": self.player_values.to_dict(),
+            "dealer_final_hand_value_counts": self.dealer_values.to_dict(),
+        }
+        if player_final_hand_values is not None:
+            results["player_final_hand_values"] = list(player_final_hand_values)
+        if dealer_final_hand_values is not None:
+            results["dealer_final_hand_values"] = list(dealer_final_hand_values)
+        results["win_record"] = dict(self.win_record)
+        results["dealer_bust_count"] = self.dealer_busts
+        results["final_hand_value_stats"] = {"player": self.player_value_stats.to_dict(),
+                                             "dealer": self.dealer_value_stats.to_dict()}
+        results["metrics"] = self.metrics()
+        return results
+
+    @classmethod
+    def from_results(cls, results):
+        """Rebuild the aggregate of a results file, with histograms or per-game lists."""
+        aggregate = cls()
+        aggregate.player_cards = CardCounter.from_dict(results["player_card_frequencies"])
+        aggregate.dealer_cards = CardCounter.from_dict(results["dealer_card_frequencies"])
+        for side in ("player", "dealer"):
+            counts = results.get(f"{side}_final_hand_value_counts")
+            if counts is None:
+                # Counted in C rather than one Python call per game
+                counts = Counter(results[f"{side}_final_hand_values"])
+            histogram = Histogram.from_dict(counts)
+            setattr(aggregate, f"{side}_values", histogram)
+            setattr(aggregate, f"{side}_value_stats", RunningStats.from_histogram(histogram))
+        aggregate.win_record.update(results["win_record"])
+        aggregate.num_games = aggregate.player_values.total
+        # Older results files only carry the bust rate
+        aggregate.dealer_busts = results.get("dealer_bust_count",
+                                             round(results["metrics"]["dealer_bust_rate"] * aggregate.num_games / 100))
+        return aggregate
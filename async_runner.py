@@ -0,0 +1,52 @@
+import asyncio
+import traceback
+from tqdm import tqdm
+
+
+async def run_games(play_game, num_games, concurrency=8, desc="Running games", scheduler=None, should_stop=None):
+    """Play `num_games` games with at most `concurrency` of them in flight at once.
+
+    A fixed pool of worker tasks pulls game numbers from one shared iterator, so a
+    new game only starts when a worker frees up. That bounds memory and the number
+    of open requests, and gives natural backpressure when the provider slows down.
+    Each game is a coroutine that awaits its own draws in order.
+
+    A game that raises is logged and skipped so the other games, and the results
+    already collected, survive one bad request. Returns the number of failed games.
+
+    With a WaveScheduler the `concurrency` games advance in lockstep and their
+    draws are sent in waves; the scheduler is told when each game starts and ends.
+
+    With `should_stop`, workers check it before each new game and start no more
+    once it returns True; games already in flight still finish.
+    """
+    game_numbers = iter(range(num_games))
+    progress = tqdm(total=num_games, desc=desc)
+    failed = 0
+
+    async def worker():
+        nonlocal failed
+        for game_number in game_numbers:
+            if should_stop is not None and should_stop():
+                break
+            if scheduler is not None:
+                scheduler.game_started()
+            try:
+                await play_game()
+            except Exception:
+                failed += 1
+                progress.write(f"Game {game_number + 1} failed and was skipped:\n{traceback.format_exc()}")
+            finally:
+                if scheduler is not None:
+                    scheduler.game_finished()
+            progress.update(1)
+
+    try:
+        await asyncio.gather(*(worker() for _ in range(max(1, min(concurrency, num_games)))))
+    finally:
+        progress.close()
+    if scheduler is not None:
+        print(f"Sent {scheduler.draws} draws in {scheduler.waves} waves")
+    if failed:
+        print(f"{failed} of {num_games} games failed and are missing from the results")
+    return failed
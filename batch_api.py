@@ -0,0 +1,158 @@
+import asyncio
+import json
+import os
+import random
+import uuid
+from cards import valid_cards
+from constrained import anthropic_response_text, card_from_response
+from card_parser import parse_card
+
+
+class AnthropicBatches:
+    """Anthropic Message Batches endpoint; request params are `messages.create` keyword arguments."""
+
+    def __init__(self, client):
+        self.client = client
+
+    async def submit(self, requests):
+        batch = await self.client.messages.batches.create(
+            requests=[{"custom_id": custom_id, "params": params} for custom_id, params in requests])
+        return batch.id
+
+    async def done(self, batch_id):
+        batch = await self.client.messages.batches.retrieve(batch_id)
+        return batch.processing_status == "ended"
+
+    async def results(self, batch_id):
+        texts = {}
+        async for entry in await self.client.messages.batches.results(batch_id):
+            if entry.result.type == "succeeded":
+                texts[entry.custom_id] = anthropic_response_text(entry.result.message)
+        return texts
+
+
+class OpenAIBatches:
+    """OpenAI Batch API over /v1/chat/completions; request params are `chat.completions.create` arguments."""
+
+    def __init__(self, client):
+        self.client = client
+
+    async def submit(self, requests):
+        lines = [json.dumps({"custom_id": custom_id, "method": "POST", "url": "/v1/chat/completions", "body": params})
+                 for custom_id, params in requests]
+        input_file = await self.client.files.create(file=("draws.jsonl", "\n".join(lines).encode()), purpose="batch")
+        batch = await self.client.batches.create(input_file_id=input_file.id, endpoint="/v1/chat/completions",
+                                                 completion_window="24h")
+        return batch.id
+
+    async def done(self, batch_id):
+        batch = await self.client.batches.retrieve(batch_id)
+        if batch.status in ("failed", "cancelled"):
+            raise RuntimeError(f"OpenAI batch {batch_id} {batch.status}")
+        # An expired batch still returns the requests it finished
+        return batch.status in ("completed", "expired")
+
+    async def results(self, batch_id):
+        batch = await self.client.batches.retrieve(batch_id)
+        if not batch.output_file_id:
+            return {}
+        content = await self.client.files.content(batch.output_file_id)
+        return read_chat_completion_lines(content.text)
+
+
+class LocalBatches:
+    """File-based stand-in for a batch endpoint, for running batch mode offline.
+
+    Each batch is written to `directory` as an OpenAI-style input JSONL file and
+    answered into a matching output file by `respond(params)` (a uniformly random
+    card by default), after `delay` seconds.
+    """
+
+    def __init__(self, directory="local_batches", respond=None, delay=0.0):
+        self.directory = directory
+        self.respond = respond or (lambda params: random.choice(valid_cards))
+        self.delay = delay
+        os.makedirs(directory, exist_ok=True)
+
+    def path(self, batch_id, kind):
+        return os.path.join(self.directory, f"{batch_id}.{kind}.jsonl")
+
+    async def submit(self, requests):
+        batch_id = f"batch_{uuid.uuid4().hex}"
+        with open(self.path(batch_id, "input"), "w") as file:
+            for custom_id, params in requests:
+                file.write(json.dumps({"custom_id": custom_id, "method": "POST",
+                                       "url": "/v1/chat/completions", "body": params}) + "\n")
+        return batch_id
+
+    async def done(self, batch_id):
+        await asyncio.sleep(self.delay)
+        with open(self.path(batch_id, "input")) as requests, open(self.path(batch_id, "output"), "w") as responses:
+            for line in requests:
+                request = json.loads(line)
+                content = self.respond(request["body"])
+                responses.write(json.dumps({"custom_id": request["custom_id"], "response": {
+                    "status_code": 200, "body": {"choices": [{"message": {"content": content}}]}}}) + "\n")
+        return True
+
+    async def results(self, batch_id):
+        with open(self.path(batch_id, "output")) as file:
+            return read_chat_completion_lines(file.read())
+
+
+def read_chat_completion_lines(text):
+    """Map custom_id -> completion text for the successful lines of a batch output JSONL file."""
+    texts = {}
+    for line in text.splitlines():
+        if not line.strip():
+            continue
+        entry = json.loads(line)
+        response = entry.get("response") or {}
+        if response.get("status_code") == 200:
+            texts[entry["custom_id"]] = response["body"]["choices"][0]["message"]["content"]
+    return texts
+
+
+async def run_batch(batches, requests, poll_interval=30.0):
+    """Submit one batch of (custom_id, params) requests, poll until it ends and return custom_id -> text."""
+    batch_id = await batches.submit(requests)
+    print(f"Submitted batch {batch_id} with {len(requests)} requests")
+    while not await batches.done(batch_id):
+        await asyncio.sleep(poll_interval)
+    return await batches.results(batch_id)
+
+
+def batch_wave(batches, build_params, retries=3, poll_interval=30.0, stats=None):
+    """Wave function that sends each wave of draws as one batch job.
+
+    Draws whose response is not a valid card are resubmitted together in a
+    follow-up batch, up to `retries` batches per wave, and then fall back to a
+    random card, as query_llm_for_card does for single requests. Attempts and
+    fallbacks are recorded in `stats` (a DrawStats) when given.
+    """
+    async def draw_wave(game_states):
+        cards = [None] * len(game_states)
+        remaining = list(range(len(game_states)))
+        for attempt in range(retries):
+            requests = [(f"draw-{index}", build_params(game_states[index])) for index in remaining]
+            texts = await run_batch(batches, requests, poll_interval)
+            invalid = []
+            for index in remaining:
+                card = parse_card(card_from_response(texts.get(f"draw-{index}") or ""))
+                if card:
+                    cards[index] = card
+                    if stats is not None:
+                        stats.record(attempt + 1)
+                else:
+                    invalid.append(index)
+            remaining = invalid
+            if not remaining:
+                break
+        for index in remaining:
+            cards[index] = random.choice(valid_cards)
+            if stats is not None:
+                stats.record(retries, fell_back=True)
+        if remaining:
+            print(f"LLM failed to return a valid card for {len(remaining)} draws. Falling back to random cards.")
+        return cards
+    return draw_wave
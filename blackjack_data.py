@@ -1,318 +1,4 @@
-import ollama
-import random
-from collections import defaultdict
-import matplotlib.pyplot as plt
-import json
-from tqdm import tqdm  # Import tqdm for progress tracking
-import re  # Import regex module for pattern matching
+from dealer_engine import run_script
 
-# Ask the user for the model, temperature settings, and shot type
-llm_name = input("Enter the model name to use (e.g., 'gemma_temp0.5'): ")
-temperature = input("Enter the temperature setting (e.g., '1.0'): ")
-shot_type = input("Enter 'zero' for zero-shot or 'few' for few-shot: ").strip().lower()
-
-def query_llm_for_card(game_state):
-    """Query the LLM to decide which card to draw based on the game state."""
-    valid_cards = {'2', '3', '4', '5', '6', '7', '8', '9', '10', 'Jack', 'Queen', 'King', 'Ace'}
-    retries = 3  # Allow up to 3 attempts to get a valid card
-
-    # Define the message based on shot type
-    if shot_type == 'few':
-        messages = [
-            {
-                'role': 'user',
-                'content': (
-                    "You are a blackjack dealer at a casino. You will be responsible for drawing cards randomly for both the player and dealer. You will respond with the card that you draw as the dealer."
-                    "Possible cards you can draw are [2, 3, 4, 5, 6, 7, 8, 9, 10, Jack, Queen, King, Ace]."
-                    "You will be provided the game state."
-                    f"Game state: {game_state}"
-                    "Do not include any additional text, explanations, or spaces. Respond only with a character or a single word without any special characters."
-                    "Here are some examples of responses:"
-                    "Q: Your drawn card is"
-                    "A: Ace"
-                    "Q: Your drawn card is"
-                    "A: 4"
-                    "Q: Your drawn card is"
-                    "A: King"
-                    "Your drawn card is"
-                )
-            }
-        ]
-    else:
-        # Zero-shot message
-        messages = [
-            {
-                'role': 'user',
-                'content': (
-                    "You are a blackjack dealer at a casino." 
-                    "You will be responsible for drawing cards randomly for both the player and dealer. You will respond with the card that you draw as the dealer."
-                    "Possible cards you can draw are [2, 3, 4, 5, 6, 7, 8, 9, 10, Jack, Queen, King, Ace]."
-                    "You will be provided the game state."
-                    "You will now randomly draw your cards from the deck to deal."
-                    f"Game state: {game_state}"
-                    "Do not give any additional details."
-                    "Your drawn card is"
-                )
-            }
-        ]
-
-    for attempt in range(retries):
-        res = ollama.chat(
-            model=llm_name,
-            messages=messages,
-            #temperature=float(temperature)  # Use the user-specified temperature
-        )
-        chosen_card = res['message']['content'].strip()
-
-        # Print the chosen card by LLM
-        print(f"Attempt {attempt + 1}: LLM chose card '{chosen_card}'")
-
-        # Extract the card name from the response by finding any valid card within the response text
-        matched_card = next((card for card in valid_cards if re.search(r'\b' + card + r'\b', chosen_card)), None)
-        
-        if matched_card:
-            print(f"Recognized valid card: '{matched_card}'")
-            return matched_card
-
-    # Fallback to a random card if LLM does not return a valid card after retries
-    fallback_card = random.choice(list(valid_cards))
-    print(f"LLM failed to return a valid card. Falling back to random card: '{fallback_card}'")
-    return fallback_card
-
-def draw_card(game_state):
-    """Draw a card using the LLM's response."""
-    return query_llm_for_card(game_state)
-
-def calculate_hand_value(hand):
-    """Calculate the total value of a hand, treating Aces as 1 or 11 to optimize hand value."""
-    value = 0
-    aces = 0
-    for card in hand:
-        if card in ['Jack', 'Queen', 'King']:
-            value += 10
-        elif card == 'Ace':
-            aces += 1
-            value += 11  # Initially count Ace as 11
-        else:
-            value += int(card)
-    while value > 21 and aces:
-        value -= 10  # Convert an Ace from 11 to 1
-        aces -= 1
-    return value
-
-def player_strategy(dealer_upcard, player_hand, player_card_frequencies, dealer_hand):
-    player_hand_value = calculate_hand_value(player_hand)
-    while player_hand_value < 21:
-        game_state = {
-            "role": "Player",
-            "player_hand": player_hand,
-            "dealer_hand": dealer_hand,
-            "dealer_upcard": dealer_upcard,
-            "player_hand_value": player_hand_value,
-        }
-        if dealer_upcard in ['Jack', 'Queen', 'King', 10] and player_hand_value < 17:
-            card = draw_card(game_state)
-            player_hand.append(card)
-            player_card_frequencies[card] += 1
-            player_hand_value = calculate_hand_value(player_hand)
-            if player_hand_value > 21:
-                return player_hand_value
-        elif dealer_upcard in range(2, 7) and player_hand_value < 12:
-            card = draw_card(game_state)
-            player_hand.append(card)
-            player_card_frequencies[card] += 1
-            player_hand_value = calculate_hand_value(player_hand)
-            if player_hand_value > 21:
-                return player_hand_value
-        else:
-            break
-    return player_hand_value
-
-dealer_bust_count = 0
-
-def dealer_strategy(dealer_hand, dealer_card_frequencies, player_hand):
-    dealer_hand_value = calculate_hand_value(dealer_hand)
-    dealer_busted = False
-    while dealer_hand_value < 17 or (dealer_hand_value == 17 and 'Ace' in dealer_hand):
-        game_state = {
-            "role": "Dealer",
-            "player_hand": player_hand,
-            "dealer_hand": dealer_hand,
-            "dealer_hand_value": dealer_hand_value,
-        }
-        card = draw_card(game_state)
-        dealer_hand.append(card)
-        dealer_card_frequencies[card] += 1
-        dealer_hand_value = calculate_hand_value(dealer_hand)
-    if dealer_hand_value > 21:
-        global dealer_bust_count
-        dealer_bust_count += 1
-        dealer_busted = True
-    return dealer_hand_value, dealer_busted
-
-def declare_winner(player_hand_value, dealer_hand_value):
-    if player_hand_value > 21:
-        return "Dealer wins! Player busted."
-    elif dealer_hand_value > 21:
-        return "Player wins! Dealer busted."
-    elif player_hand_value > dealer_hand_value:
-        return "Player wins!"
-    elif dealer_hand_value > player_hand_value:
-        return "Dealer wins!"
-    else:
-        return "It's a tie!"
-
-# Lists to store final hand values and card frequencies for each round
-player_final_hand_values = []
-dealer_final_hand_values = []
-player_card_frequencies = defaultdict(int)
-dealer_card_frequencies = defaultdict(int)
-win_record = defaultdict(int, {"Player": 0, "Dealer": 0, "Tie": 0})
-
-# Function to run the game once and record results
-def run_single_game():
-    # Setting up initial hands for the dealer and player
-    dealer_hand = [
-        draw_card({"role": "Setup", "description": "Setting up dealer's initial hand", "dealer_hand": [], "player_hand": []}),
-        draw_card({"role": "Setup", "description": "Setting up dealer's initial hand", "dealer_hand": [], "player_hand": []})
-    ]
-    dealer_upcard = dealer_hand[0]
-    
-    # Track initial dealer hand in frequencies
-    for card in dealer_hand:
-        dealer_card_frequencies[card] += 1
-    
-    player_hand = [
-        draw_card({"role": "Setup", "description": "Setting up player's initial hand", "dealer_hand": dealer_hand, "player_hand": []}),
-        draw_card({"role": "Setup", "description": "Setting up player's initial hand", "dealer_hand": dealer_hand, "player_hand": []})
-    ]
-    
-    # Track initial player hand in frequencies
-    for card in player_hand:
-        player_card_frequencies[card] += 1
-
-    # Format game state more clearly for player strategy decision
-    game_state = {
-        "role": "Player",
-        "description": "Player is making a decision based on current hand and dealer's upcard",
-        "player_hand": player_hand,
-        "dealer_upcard": dealer_upcard,
-        "player_hand_value": calculate_hand_value(player_hand),
-    }
-    
-    # Calculate player hand value and dealer hand value, and decide the winner
-    player_hand_value = player_strategy(dealer_upcard, player_hand, player_card_frequencies, dealer_hand)
-    
-    if player_hand_value <= 21:
-        # Format game state more clearly for dealer strategy decision
-        game_state = {
-            "role": "Dealer",
-            "description": "Dealer is making a decision based on current hand and player’s hand",
-            "dealer_hand": dealer_hand,
-            "dealer_hand_value": calculate_hand_value(dealer_hand),
-            "player_hand": player_hand,
-        }
-        dealer_hand_value, dealer_busted = dealer_strategy(dealer_hand, dealer_card_frequencies, player_hand)
-    else:
-        dealer_hand_value = calculate_hand_value(dealer_hand)
-
-    # Record the hand values for analysis
-    player_final_hand_values.append(player_hand_value)
-    dealer_final_hand_values.append(dealer_hand_value)
-    
-    # Determine the winner and update win records
-    result = declare_winner(player_hand_value, dealer_hand_value)
-    if "Player wins" in result:
-        win_record['Player'] += 1
-    elif "Dealer wins" in result:
-        win_record['Dealer'] += 1
-    else:
-        win_record['Tie'] += 1
-
-    # Print game details
-    print("Game Details:")
-    print(f"  Dealer Hand: {dealer_hand}, Dealer Hand Value: {dealer_hand_value}")
-    print(f"  Player Hand: {player_hand}, Player Hand Value: {player_hand_value}")
-    print(f"  Result: {result}\n")
-
-dealer_bust_count = 0
-# Run 1000 games for LLM with tqdm progress bar
-for _ in tqdm(range(1000), desc="Running games"):
-    run_single_game()
-
-# # Calculate metrics
-# llm_name = "llama3.1:8b"
-dealer_bust_rate = (dealer_bust_count / 1000) * 100
-player_win_rate = (win_record['Player'] / 1000) * 100
-average_player_hand_value = sum(player_final_hand_values) / len(player_final_hand_values)
-average_dealer_hand_value = sum(dealer_final_hand_values) / len(dealer_final_hand_values)
-
-# Print metrics
-print(f"{llm_name} - Player Win Rate: {player_win_rate:.3f}%")
-print(f"{llm_name} - Dealer Bust Rate: {dealer_bust_rate:.3f}%")
-print(f"{llm_name} - Average Player Hand Value: {average_player_hand_value:.2f}")
-print(f"{llm_name} - Average Dealer Hand Value: {average_dealer_hand_value:.2f}")
-
-# Save results for future comparison
-llm_results = {
-    "llm_name": llm_name,
-    "temperature": temperature,
-    "shot_type": shot_type,
-    "player_card_frequencies": dict(player_card_frequencies),
-    "dealer_card_frequencies": dict(dealer_card_frequencies),
-    "player_final_hand_values": player_final_hand_values,
-    "dealer_final_hand_values": dealer_final_hand_values,
-    "win_record": dict(win_record),
-    "metrics": {
-        "player_win_rate": player_win_rate,
-        "dealer_bust_rate": dealer_bust_rate,
-        "average_player_hand_value": average_player_hand_value,
-        "average_dealer_hand_value": average_dealer_hand_value
-    }
-}
-
-filename = f"{llm_name}_temp{temperature}_{shot_type}.json"
-with open(filename, "w") as file:
-    json.dump(llm_results, file)
-
-
-# Define color schemes
-player_color = 'blue'
-dealer_color = 'orange'
-
-# Plot final hand values
-plt.figure(figsize=(10, 5))
-plt.hist(player_final_hand_values, bins=range(10, 31), alpha=0.5, label='Player Hand Values', color=player_color)
-plt.hist(dealer_final_hand_values, bins=range(10, 31), alpha=0.5, label='Dealer Hand Values', color=dealer_color)
-plt.xlabel('Final Hand Value')
-plt.ylabel('Frequency')
-plt.legend()
-plt.title(f'Distribution of Final Hand Values over 1000 Games ({llm_name}) - {shot_type.capitalize()} Shot, Temp {temperature}')
-plt.show()
-
-# Plot card draw frequencies
-fig, ax = plt.subplots(1, 2, figsize=(14, 5))
-
-ax[0].bar(player_card_frequencies.keys(), player_card_frequencies.values(), color=player_color)
-ax[0].set_title(f'Player Card Draw Frequencies ({llm_name})')
-ax[0].set_xlabel('Card')
-ax[0].set_ylabel('Frequency')
-
-ax[1].bar(dealer_card_frequencies.keys(), dealer_card_frequencies.values(), color=dealer_color)
-ax[1].set_title(f'Dealer Card Draw Frequencies ({llm_name})')
-ax[1].set_xlabel('Card')
-ax[1].set_ylabel('Frequency')
-
-plt.suptitle(f'Card Frequencies ({llm_name}) - {shot_type.capitalize()} Shot, Temp {temperature}')
-plt.tight_layout(rect=[0, 0, 1, 0.96])
-plt.show()
-
-
-# Plot win rate
-labels = list(win_record.keys())
-sizes = list(win_record.values())
-
-plt.figure(figsize=(7, 7))
-plt.pie(sizes, labels=labels, autopct='%1.1f%%', startangle=140)
-plt.title(f'Win Rate Over 1000 Games ({llm_name}) - {shot_type.capitalize()} Shot, Temp {temperature}')
-plt.show()
+# A local Ollama model as an honest dealer; the game loop, backends and draw modes live in dealer_engine.py
+run_script("ollama", "honest")
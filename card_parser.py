@@ -0,0 +1,63 @@
+import argparse
+import re
+import timeit
+from cards import valid_cards
+
+# Lowercase spellings of each card, matched as whole words
+card_aliases = {card.lower(): card for card in valid_cards}
+card_aliases.update({"two": "2", "three": "3", "four": "4", "five": "5", "six": "6",
+                     "seven": "7", "eight": "8", "nine": "9", "ten": "10"})
+# Single letters are only read as a card when they are the whole answer; inside
+# a sentence "a" is far more often the article than an Ace
+letter_aliases = {"j": "Jack", "q": "Queen", "k": "King", "a": "Ace"}
+
+# One alternation over every spelling, longest first so "10" is never read as a shorter match
+card_pattern = re.compile(
+    r"\b(" + "|".join(sorted(map(re.escape, card_aliases), key=len, reverse=True)) + r")\b", re.IGNORECASE)
+letter_pattern = re.compile(r"\W*([" + "".join(letter_aliases) + r"])\W*", re.IGNORECASE)
+
+
+def parse_card(text):
+    """Return the card named in a response, or None if it names none.
+
+    Matching ignores case and accepts number words ("ten") and, as the whole
+    answer, the letters J/Q/K/A. When a response names several cards the
+    leftmost one wins, so "King, not a 10" is a King.
+    """
+    if not text:
+        return None
+    letter = letter_pattern.fullmatch(text)
+    if letter:
+        return letter_aliases[letter.group(1).lower()]
+    match = card_pattern.search(text)
+    if match:
+        return card_aliases[match.group(1).lower()]
+    return None
+
+
+def regex_scan(text, cards=frozenset(valid_cards)):
+    """The per-card scan parse_card replaces: one re.search per card, in set order."""
+    return next((card for card in cards if re.search(r'\b' + card + r'\b', text)), None)
+
+
+benchmark_responses = ["King", "  7", "10.", "ace", "I draw a Queen", "The card is: Jack of spades",
+                       "Q", "ten", "Sure! Here is my card: 4", "no card here"]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Parse LLM responses into cards, or time the parser.")
+    parser.add_argument("responses", nargs="*", help="Responses to parse.")
+    parser.add_argument("--benchmark", action="store_true",
+                        help="Time parse_card against the per-card regex scan on sample responses.")
+    parser.add_argument("--number", type=int, default=20000, help="Passes over the samples when benchmarking.")
+    args = parser.parse_args()
+
+    for response in args.responses:
+        print(f"{response!r} -> {parse_card(response)!r}")
+
+    if args.benchmark:
+        for name, parse in (("regex scan", regex_scan), ("parse_card", parse_card)):
+            seconds = timeit.timeit(lambda: [parse(text) for text in benchmark_responses], number=args.number)
+            calls = args.number * len(benchmark_responses)
+            print(f"{name}: {seconds / calls * 1e6:.2f} us per response "
+                  f"({sum(parse(text) is not None for text in benchmark_responses)}/{len(benchmark_responses)} parsed)")
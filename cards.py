@@ -0,0 +1,72 @@
+"""Card ranks and rank codes shared by the blackjack simulations."""
+
+# Define valid card options, in rank-code order (code = index into this list)
+valid_cards = ['2', '3', '4', '5', '6', '7', '8', '9', '10', 'Jack', 'Queen', 'King', 'Ace']
+card_codes = {card: code for code, card in enumerate(valid_cards)}
+
+# Blackjack value of each rank code, with the Ace initially counted as 11
+card_values = [2, 3, 4, 5, 6, 7, 8, 9, 10, 10, 10, 10, 11]
+ace_code = card_codes['Ace']
+
+# Dealer upcards the random baseline's player keeps hitting against while below 17
+hit_upcards = ['10', 'Jack', 'Queen', 'King']
+# The LLM drivers test `dealer_upcard in ['Jack', 'Queen', 'King', 10]` with an int 10,
+# so a '10' upcard never makes their player hit
+llm_hit_upcards = ['Jack', 'Queen', 'King']
+
+
+class Hand:
+    """A blackjack hand that keeps its value up to date as cards are added.
+
+    Cards are stored as rank codes; the total, the number of Aces still counted
+    as 11 and the number of Aces are updated incrementally, so reading the value
+    is O(1) instead of re-scanning the hand. Iterating or printing a hand gives
+    card names, so it reads like the list of names it replaces.
+    """
+    __slots__ = ('codes', 'value', 'soft_aces', 'aces')
+
+    def __init__(self, cards=()):
+        self.codes = bytearray()
+        self.value = 0
+        self.soft_aces = 0
+        self.aces = 0
+        for card in cards:
+            self.add(card)
+
+    def add(self, card):
+        """Add a card by name and return the new hand value."""
+        return self.add_code(card_codes[card])
+
+    def add_code(self, code):
+        """Add a card by rank code and return the new hand value."""
+        self.codes.append(code)
+        self.value += card_values[code]
+        if code == ace_code:
+            self.aces += 1
+            self.soft_aces += 1
+        while self.value > 21 and self.soft_aces:
+            self.value -= 10  # Convert an Ace from 11 to 1
+            self.soft_aces -= 1
+        return self.value
+
+    @property
+    def has_ace(self):
+        return self.aces > 0
+
+    def __len__(self):
+        return len(self.codes)
+
+    def __iter__(self):
+        return (valid_cards[code] for code in self.codes)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [valid_cards[code] for code in self.codes[index]]
+        return valid_cards[self.codes[index]]
+
+    def __contains__(self, card):
+        code = card_codes.get(card)
+        return code is not None and code in self.codes
+
+    def __repr__(self):
+        return repr(list(self))
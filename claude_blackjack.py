@@ -1,285 +1,4 @@
-import anthropic
-import random
-from collections import defaultdict
-import matplotlib.pyplot as plt
-import json
-from tqdm import tqdm
-import time
-from config import CLAUDE_API_KEY
+from dealer_engine import run_script
 
-# Ask user for model name, temperature, and shot type
-model_name = input("Enter the LLM model name (e.g., 'claude-3-5-haiku-20241022'): ")
-temperature = float(input("Enter the temperature setting (e.g., 0.5): "))
-shot_type = input("Enter 'few' for few-shot or 'zero' for zero-shot prompting: ").strip().lower()
-
-client = anthropic.Anthropic(api_key=CLAUDE_API_KEY)
-
-def query_llm_for_card(game_state):
-    """Query the LLM to decide which card to draw based on the game state."""
-    valid_cards = {'2', '3', '4', '5', '6', '7', '8', '9', '10', 'Jack', 'Queen', 'King', 'Ace'}
-    retries = 3  # Allow up to 3 attempts to get a valid card
-
-    for attempt in range(retries):
-        if shot_type == 'few':
-            messages = [
-                {
-                    'role': 'user',
-                    'content': (
-                        "You are a blackjack dealer at a casino. You will be responsible for drawing cards randomly for both the player and dealer. You will respond with the card that you draw as the dealer."
-                        "Possible cards you can draw are [2, 3, 4, 5, 6, 7, 8, 9, 10, Jack, Queen, King, Ace]."
-                        "You will be provided the game state."
-                        f"Game state: {game_state}"
-                        "Do not include any additional text, explanations, or spaces. Respond only with a character or a single word without any special characters."
-                        "Here are some examples of responses:"
-                        "Q: Your drawn card is"
-                        "A: Ace"
-                        "Q: Your drawn card is"
-                        "A: 4"
-                        "Q: Your drawn card is"
-                        "A: King"
-                        "Your drawn card is"
-                    )
-                }
-            ]
-        else:  # Zero-shot
-            messages = [
-                {
-                    'role': 'user',
-                    'content': (
-                        "You are a blackjack dealer at a casino. You will be responsible for drawing cards randomly for both the player and dealer. You will respond with the card that you draw as the dealer."
-                        "Possible cards you can draw are [2, 3, 4, 5, 6, 7, 8, 9, 10, Jack, Queen, King, Ace]."
-                        "You will be provided the game state."
-                        f"Game state: {game_state}"
-                        "Do not include any additional text, explanations, or spaces. Respond only with a character or a single word without any special characters."
-                        "Your drawn card is"
-                    )
-                }
-            ]
-
-        time.sleep(1.2)    
-        res = client.messages.create(
-            model=model_name,
-            messages=messages,
-            temperature=temperature,
-            max_tokens=10
-        )
-        # Accessing the response content directly
-        chosen_card = res.content[0].text.strip()
-
-        # Print the chosen card by LLM
-        print(f"Attempt {attempt + 1}: LLM chose card '{chosen_card}'")
-
-        if chosen_card in valid_cards:
-            return chosen_card
-
-    # Fallback to a random card if LLM does not return a valid card after retries
-    fallback_card = random.choice(list(valid_cards))
-    print(f"LLM failed to return a valid card. Falling back to random card: '{fallback_card}'")
-    return fallback_card
-
-def draw_card(game_state):
-    """Draw a card using the LLM's response."""
-    return query_llm_for_card(game_state)
-
-def calculate_hand_value(hand):
-    """Calculate the total value of a hand, treating Aces as 1 or 11 to optimize hand value."""
-    value = 0
-    aces = 0
-    for card in hand:
-        if card in ['Jack', 'Queen', 'King']:
-            value += 10
-        elif card == 'Ace':
-            aces += 1
-            value += 11  # Initially count Ace as 11
-        else:
-            value += int(card)
-    while value > 21 and aces:
-        value -= 10  # Convert an Ace from 11 to 1
-        aces -= 1
-    return value
-
-def player_strategy(dealer_upcard, player_hand, player_card_frequencies, dealer_hand):
-    player_hand_value = calculate_hand_value(player_hand)
-    while player_hand_value < 21:
-        game_state = {
-            "role": "Player",
-            "player_hand": player_hand,
-            "dealer_hand": dealer_hand,
-            "dealer_upcard": dealer_upcard,
-            "player_hand_value": player_hand_value,
-        }
-        if dealer_upcard in ['Jack', 'Queen', 'King', 10] and player_hand_value < 17:
-            card = draw_card(game_state)
-            player_hand.append(card)
-            player_card_frequencies[card] += 1
-            player_hand_value = calculate_hand_value(player_hand)
-            if player_hand_value > 21:
-                return player_hand_value
-        elif dealer_upcard in range(2, 7) and player_hand_value < 12:
-            card = draw_card(game_state)
-            player_hand.append(card)
-            player_card_frequencies[card] += 1
-            player_hand_value = calculate_hand_value(player_hand)
-            if player_hand_value > 21:
-                return player_hand_value
-        else:
-            break
-    return player_hand_value
-
-dealer_bust_count = 0
-
-def dealer_strategy(dealer_hand, dealer_card_frequencies, player_hand):
-    dealer_hand_value = calculate_hand_value(dealer_hand)
-    dealer_busted = False
-    while dealer_hand_value < 17 or (dealer_hand_value == 17 and 'Ace' in dealer_hand):
-        game_state = {
-            "role": "Dealer",
-            "player_hand": player_hand,
-            "dealer_hand": dealer_hand,
-            "dealer_hand_value": dealer_hand_value,
-        }
-        card = draw_card(game_state)
-        dealer_hand.append(card)
-        dealer_card_frequencies[card] += 1
-        dealer_hand_value = calculate_hand_value(dealer_hand)
-    if dealer_hand_value > 21:
-        global dealer_bust_count
-        dealer_bust_count += 1
-        dealer_busted = True
-    return dealer_hand_value, dealer_busted
-
-def declare_winner(player_hand_value, dealer_hand_value):
-    if player_hand_value > 21:
-        return "Dealer wins! Player busted."
-    elif dealer_hand_value > 21:
-        return "Player wins! Dealer busted."
-    elif player_hand_value > dealer_hand_value:
-        return "Player wins!"
-    elif dealer_hand_value > player_hand_value:
-        return "Dealer wins!"
-    else:
-        return "It's a tie!"
-
-# Lists to store final hand values and card frequencies for each round
-player_final_hand_values = []
-dealer_final_hand_values = []
-player_card_frequencies = defaultdict(int)
-dealer_card_frequencies = defaultdict(int)
-win_record = defaultdict(int, {"Player": 0, "Dealer": 0, "Tie": 0})
-
-# Function to run the game once and record results
-def run_single_game():
-    dealer_hand = [draw_card({"role": "Setup", "dealer_hand": [], "player_hand": []}), draw_card({"role": "Setup", "dealer_hand": [], "player_hand": []})]
-    dealer_upcard = dealer_hand[0]
-    
-    # Track initial dealer hand in frequencies
-    for card in dealer_hand:
-        dealer_card_frequencies[card] += 1
-    
-    player_hand = [draw_card({"role": "Setup", "dealer_hand": dealer_hand, "player_hand": []}), draw_card({"role": "Setup", "dealer_hand": dealer_hand, "player_hand": []})]
-    
-    # Track initial player hand in frequencies
-    for card in player_hand:
-        player_card_frequencies[card] += 1
-
-    # Calculate player hand value and dealer hand value, and decide the winner
-    player_hand_value = player_strategy(dealer_upcard, player_hand, player_card_frequencies, dealer_hand)
-    if player_hand_value <= 21:
-        dealer_hand_value, dealer_busted = dealer_strategy(dealer_hand, dealer_card_frequencies, player_hand)
-    else:
-        dealer_hand_value = calculate_hand_value(dealer_hand)
-
-    player_final_hand_values.append(player_hand_value)
-    dealer_final_hand_values.append(dealer_hand_value)
-    
-    # Determine the winner
-    result = declare_winner(player_hand_value, dealer_hand_value)
-    if "Player wins" in result:
-        win_record['Player'] += 1
-    elif "Dealer wins" in result:
-        win_record['Dealer'] += 1
-    else:
-        win_record['Tie'] += 1
-
-    # Print game details
-    print("Game Details:")
-    print(f"  Dealer Hand: {dealer_hand}, Dealer Hand Value: {dealer_hand_value}")
-    print(f"  Player Hand: {player_hand}, Player Hand Value: {player_hand_value}")
-    print(f"  Result: {result}\n")
-
-dealer_bust_count = 0
-# Run 1000 games for LLM with tqdm progress bar
-for _ in tqdm(range(1000), desc="Running games"):
-    run_single_game()
-
-# Calculate metrics
-dealer_bust_rate = (dealer_bust_count / 1000) * 100
-player_win_rate = (win_record['Player'] / 1000) * 100
-average_player_hand_value = sum(player_final_hand_values) / len(player_final_hand_values)
-average_dealer_hand_value = sum(dealer_final_hand_values) / len(dealer_final_hand_values)
-
-# File name based on model name, temperature, and shot type
-llm_results_filename = f"{model_name}_{shot_type}shot_temp_{temperature}.json"
-llm_name = f"{model_name}"
-# Print metrics
-print(f"{llm_name} - Player Win Rate: {player_win_rate:.3f}%")
-print(f"{llm_name} - Dealer Bust Rate: {dealer_bust_rate:.3f}%")
-print(f"{llm_name} - Average Player Hand Value: {average_player_hand_value:.2f}")
-print(f"{llm_name} - Average Dealer Hand Value: {average_dealer_hand_value:.2f}")
-
-# Save results for future comparison
-llm_results = {
-    "llm_name": model_name,
-    "shot_type": shot_type,
-    "temperature": temperature,
-    "player_card_frequencies": dict(player_card_frequencies),
-    "dealer_card_frequencies": dict(dealer_card_frequencies),
-    "player_final_hand_values": player_final_hand_values,
-    "dealer_final_hand_values": dealer_final_hand_values,
-    "win_record": dict(win_record),
-    "metrics": {
-        "player_win_rate": player_win_rate,
-        "dealer_bust_rate": dealer_bust_rate,
-        "average_player_hand_value": average_player_hand_value,
-        "average_dealer_hand_value": average_dealer_hand_value
-    }
-}
-
-with open(llm_results_filename, "w") as file:
-    json.dump(llm_results, file)
-
-# Plot final hand values
-plt.figure(figsize=(10, 5))
-plt.hist(player_final_hand_values, bins=range(10, 31), alpha=0.5, label='Player Hand Values')
-plt.hist(dealer_final_hand_values, bins=range(10, 31), alpha=0.5, label='Dealer Hand Values')
-plt.xlabel('Final Hand Value')
-plt.ylabel('Frequency')
-plt.legend()
-plt.title(f'Distribution of Final Hand Values over 1000 Games ({model_name}) - {shot_type.capitalize()} Shot, Temp {temperature}')
-plt.show()
-
-# Plot card draw frequencies
-fig, ax = plt.subplots(1, 2, figsize=(14, 5))
-
-ax[0].bar(player_card_frequencies.keys(), player_card_frequencies.values())
-ax[0].set_title(f'Player Card Draw Frequencies ({model_name}) - {shot_type.capitalize()} Shot')
-ax[0].set_xlabel('Card')
-ax[0].set_ylabel('Frequency')
-
-ax[1].bar(dealer_card_frequencies.keys(), dealer_card_frequencies.values())
-ax[1].set_title(f'Dealer Card Draw Frequencies ({model_name}) - {shot_type.capitalize()} Shot')
-ax[1].set_xlabel('Card')
-ax[1].set_ylabel('Frequency')
-
-plt.suptitle(f'Card Frequencies ({model_name}) - {shot_type.capitalize()} Shot, Temp {temperature}')
-plt.tight_layout(rect=[0, 0, 1, 0.96])
-plt.show()
-
-# Plot win rate
-labels = list(win_record.keys())
-sizes = list(win_record.values())
-
-plt.figure(figsize=(7, 7))
-plt.pie(sizes, labels=labels, autopct='%1.1f%%', startangle=140)
-plt.title(f'Win Rate Over 1000 Games ({model_name}) - {shot_type.capitalize()} Shot, Temp {temperature}')
-plt.show()
+# Claude as an honest dealer; the game loop, backends and draw modes live in dealer_engine.py
+run_script("anthropic", "honest")
@@ -0,0 +1,51 @@
+import json
+from cards import valid_cards
+
+# JSON schema of a constrained answer: one object whose only field is a card name
+card_schema = {
+    "type": "object",
+    "properties": {"card": {"type": "string", "enum": valid_cards}},
+    "required": ["card"],
+    "additionalProperties": False,
+}
+
+# Forced tool call whose input is the drawn card, for Anthropic models
+anthropic_card_tool = {
+    "name": "draw_card",
+    "description": "Report the card you draw.",
+    "input_schema": card_schema,
+}
+
+# Room for the JSON object or tool call around the card name
+constrained_max_tokens = {"anthropic": 64, "openai": 16}
+
+
+def constrained_request(provider, request):
+    """Return a copy of an Anthropic or OpenAI request that can only answer with one of the 13 cards."""
+    request = dict(request, max_tokens=constrained_max_tokens[provider])
+    if provider == "anthropic":
+        request["tools"] = [anthropic_card_tool]
+        request["tool_choice"] = {"type": "tool", "name": anthropic_card_tool["name"]}
+    else:
+        request["response_format"] = {"type": "json_schema",
+                                      "json_schema": {"name": "card", "strict": True, "schema": card_schema}}
+    return request
+
+
+def anthropic_response_text(message):
+    """Text of an Anthropic response; a draw_card tool call is returned as its JSON input."""
+    for block in message.content:
+        if block.type == "tool_use":
+            return json.dumps(block.input)
+    return message.content[0].text
+
+
+def card_from_response(text):
+    """The card of a constrained JSON answer, or the response text unchanged if it is not one."""
+    try:
+        answer = json.loads(text)
+    except (TypeError, ValueError):
+        return text
+    if isinstance(answer, dict) and isinstance(answer.get("card"), str):
+        return answer["card"]
+    return text
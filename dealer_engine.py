@@ -0,0 +1,774 @@
+import argparse
+import asyncio
+import json
+import random
+import matplotlib.pyplot as plt
+from cards import Hand, valid_cards, llm_hit_upcards
+from aggregators import GameAggregate
+from async_runner import run_games
+from wave_scheduler import WaveScheduler, gather_wave
+from logprob_draws import LogprobDealer
+from state_keys import DrawIndex, canonical_state_key, format_state_key
+from game_log import GameLog, game_log_path, state_key_from_json
+from sequential import SequentialMonitor
+from results_catalog import catalog_results
+from constrained import card_schema, constrained_request, anthropic_response_text, card_from_response
+from draw_stats import DrawStats
+from card_parser import parse_card
+from ollama_backend import OllamaBackend
+from draw_cache import DrawCache, open_draw_cache, cached_completion, cached_fallback
+from batch_api import AnthropicBatches, OpenAIBatches, LocalBatches, batch_wave
+from rate_limiter import RateLimiter, call_with_rate_limit, estimate_tokens
+from prompts import build_messages
+
+backend_names = ("random", "ollama", "anthropic", "openai", "replay")
+example_models = {"ollama": "llama3.1:8b", "anthropic": "claude-3-5-haiku-20241022", "openai": "gpt-4o-mini"}
+
+# Results file and setup-state descriptions of each original (provider, dealer) script
+script_outputs = {
+    ("anthropic", "honest"): ("{model}_{shot_type}shot_temp_{temperature}.json", False),
+    ("anthropic", "deceptive"): ("{model}_{shot_type}shot_temp_{temperature}_deceptive.json", False),
+    ("openai", "honest"): ("{model}_{shot_type}shot_temp_{temperature}.json", False),
+    ("openai", "deceptive"): ("{model}_{shot_type}shot_temp_{temperature}_deceptive.json", False),
+    ("ollama", "honest"): ("{model}_temp{temperature}_{shot_type}.json", True),
+    ("ollama", "deceptive"): ("{model}_{shot_type}shot_temp_{temperature}_deceptive.json", False),
+}
+
+# One limiter per provider, shared by every backend (and so every run) in the process
+rate_limiters = {}
+
+
+def provider_rate_limiter(provider, requests_per_minute, tokens_per_minute):
+    if provider not in rate_limiters:
+        rate_limiters[provider] = RateLimiter(requests_per_minute, tokens_per_minute)
+    return rate_limiters[provider]
+
+
+def results_filename(provider, dealer, model, temperature, shot_type):
+    """Results file name the original script for `provider` and `dealer` would write."""
+    deceptive_suffix = "_deceptive" if dealer == "deceptive" else ""
+    template = script_outputs.get((provider, dealer), ("{model}_{shot_type}shot_temp_{temperature}"
+                                                       + deceptive_suffix + ".json", False))[0]
+    return template.format(model=model, temperature=temperature, shot_type=shot_type)
+
+
+class RandomBackend:
+    """Uniformly random cards, with no model behind them; the baseline dealer."""
+    name = "random"
+    fetch_top_logprobs = None
+    supports_batches = False
+
+    def __init__(self):
+        self.stats = DrawStats()
+        self.draw_cache = None
+
+    async def query_card(self, game_state):
+        return random.choice(valid_cards)
+
+    def batches(self):
+        return None
+
+
+class ReplayBackend(RandomBackend):
+    """Replay a recorded run: resample the cards it drew in each game state, without calling a model.
+
+    Cards come from the results file's "state_draw_counts"; a state the run
+    never reached is drawn from its overall player or dealer card frequencies.
+    """
+    name = "replay"
+
+    def __init__(self, results_file):
+        super().__init__()
+        with open(results_file) as file:
+            data = json.load(file)
+        self.state_draws = data.get("state_draw_counts", {})
+        self.player_frequencies = data["player_card_frequencies"]
+        self.dealer_frequencies = data["dealer_card_frequencies"]
+
+    async def query_card(self, game_state):
+        draws = self.state_draws.get(format_state_key(canonical_state_key(game_state)))
+        if not draws:
+            # Setup draws deal the dealer's two cards first, then the player's
+            dealer_draw = game_state.get("role") == "Dealer" or (
+                game_state.get("role") == "Setup" and not len(game_state.get("dealer_hand") or []))
+            draws = self.dealer_frequencies if dealer_draw else self.player_frequencies
+        return random.choices(list(draws), weights=list(draws.values()))[0]
+
+
+class LLMBackend:
+    """Base for backends that ask a model for every card.
+
+    Subclasses build the request for a game state and send it; the retry loop,
+    response parsing, random fallback, draw cache and DrawStats live here.
+    `request_slots`, an asyncio.Semaphore, caps the requests in flight when
+    several runs share one provider.
+    """
+    provider = None
+    fetch_top_logprobs = None
+    supports_batches = False
+    retries = 3  # Allow up to 3 attempts to get a valid card
+
+    def __init__(self, model, temperature, shot_type="zero", dealer="honest", constrained=False, draw_cache=None,
+                 request_slots=None, verbose=True):
+        self.model = model
+        self.temperature = temperature
+        self.shot_type = shot_type
+        self.dealer = dealer
+        self.constrained = constrained
+        self.draw_cache = draw_cache
+        self.request_slots = request_slots
+        self.verbose = verbose
+        # Retries and random fallbacks needed by the draws, reported with the results
+        self.stats = DrawStats()
+
+    @property
+    def name(self):
+        return self.provider
+
+    def build_messages(self, game_state):
+        return build_messages(game_state, self.dealer, self.shot_type, self.provider)
+
+    def build_request(self, game_state):
+        raise NotImplementedError
+
+    async def complete(self, request):
+        """Send one request and return the response text."""
+        raise NotImplementedError
+
+    def batches(self):
+        """Batch endpoint for 'batch' draw mode, or None if the provider has none."""
+        return None
+
+    async def limited(self, call):
+        """Run `call()` in one of the shared request slots, if there are any."""
+        if self.request_slots is None:
+            return await call()
+        async with self.request_slots:
+            return await call()
+
+    async def query_card(self, game_state):
+        """Query the LLM to decide which card to draw based on the game state."""
+        request = self.build_request(game_state)
+        cache_key = DrawCache.key(self.provider, self.model, self.temperature, self.shot_type, request)
+
+        for attempt in range(self.retries):
+            chosen_card = card_from_response(await cached_completion(
+                self.draw_cache, cache_key, lambda: self.limited(lambda: self.complete(request)),
+                self.temperature)).strip()
+            if self.verbose:
+                print(f"Attempt {attempt + 1}: LLM chose card '{chosen_card}'")
+
+            # Extract the card named in the response; the leftmost card wins if it names several
+            matched_card = parse_card(chosen_card)
+            if matched_card:
+                if self.verbose and matched_card != chosen_card:
+                    print(f"Recognized valid card: '{matched_card}'")
+                self.stats.record(attempt + 1)
+                return matched_card
+
+        # Fallback to a random card if LLM does not return a valid card after retries
+        fallback_card = cached_fallback(self.draw_cache, cache_key, sorted(valid_cards))
+        print(f"LLM failed to return a valid card. Falling back to random card: '{fallback_card}'")
+        self.stats.record(self.retries, fell_back=True)
+        return fallback_card
+
+
+class AnthropicBackend(LLMBackend):
+    """Claude models through the Messages API, rate limited from config.py."""
+    provider = "anthropic"
+    supports_batches = True
+
+    def __init__(self, model, temperature, **options):
+        super().__init__(model, temperature, **options)
+        # Provider SDKs and config.py are only needed by the backend that uses them
+        import anthropic
+        import config
+        self.rate_limit_error = anthropic.RateLimitError
+        self.client = anthropic.AsyncAnthropic(api_key=config.CLAUDE_API_KEY, max_retries=0)
+        # Shared by all concurrent games; seeded from config.py and re-tuned from response headers
+        self.rate_limiter = provider_rate_limiter("anthropic", getattr(config, "CLAUDE_REQUESTS_PER_MINUTE", 50),
+                                                  getattr(config, "CLAUDE_TOKENS_PER_MINUTE", 40000))
+        self.batch_poll_seconds = getattr(config, "CLAUDE_BATCH_POLL_SECONDS", 30)
+
+    def build_request(self, game_state):
+        """Keyword arguments of the completion request for one draw, shared by direct and batch calls."""
+        request = {"model": self.model, "messages": self.build_messages(game_state),
+                   "temperature": self.temperature, "max_tokens": 10}
+        # Constrained mode only lets the model answer with one of the 13 cards
+        return constrained_request("anthropic", request) if self.constrained else request
+
+    async def complete(self, request):
+        res = await call_with_rate_limit(
+            self.rate_limiter, self.client.messages.with_raw_response.create, self.rate_limit_error,
+            tokens=estimate_tokens(request["messages"], request["max_tokens"]),
+            **request
+        )
+        return anthropic_response_text(res)
+
+    def batches(self):
+        return AnthropicBatches(self.client)
+
+
+class OpenAIBackend(LLMBackend):
+    """OpenAI chat models, rate limited from config.py; supports logprob draws."""
+    provider = "openai"
+    supports_batches = True
+
+    def __init__(self, model, temperature, **options):
+        super().__init__(model, temperature, **options)
+        import openai
+        import config
+        self.rate_limit_error = openai.RateLimitError
+        self.client = openai.AsyncOpenAI(api_key=config.OPENAI_API_KEY, max_retries=0)
+        self.rate_limiter = provider_rate_limiter("openai", getattr(config, "OPENAI_REQUESTS_PER_MINUTE", 500),
+                                                  getattr(config, "OPENAI_TOKENS_PER_MINUTE", 200000))
+        self.batch_poll_seconds = getattr(config, "OPENAI_BATCH_POLL_SECONDS", 30)
+
+    def build_request(self, game_state):
+        """Keyword arguments of the completion request for one draw, shared by direct and batch calls."""
+        request = {"model": self.model, "messages": self.build_messages(game_state),
+                   "temperature": self.temperature, "max_tokens": 5}
+        return constrained_request("openai", request) if self.constrained else request
+
+    async def send(self, request):
+        return await call_with_rate_limit(
+            self.rate_limiter, self.client.chat.completions.with_raw_response.create, self.rate_limit_error,
+            tokens=estimate_tokens(request["messages"], request["max_tokens"]),
+            **request
+        )
+
+    async def complete(self, request):
+        return (await self.send(request)).choices[0].message.content
+
+    async def fetch_top_logprobs(self, game_state):
+        """Request the top logprobs of the first response token for one game state."""
+        # Always unconstrained: a JSON answer would start with "{" rather than the card
+        request = {"model": self.model, "messages": self.build_messages(game_state), "temperature": self.temperature,
+                   "max_tokens": 1, "logprobs": True, "top_logprobs": 20}
+        cache_key = DrawCache.key("openai-logprobs", self.model, self.temperature, self.shot_type, request)
+
+        async def complete():
+            res = await self.limited(lambda: self.send(request))
+            return json.dumps([[entry.token, entry.logprob]
+                               for entry in res.choices[0].logprobs.content[0].top_logprobs])
+
+        return json.loads(await cached_completion(self.draw_cache, cache_key, complete, self.temperature))
+
+    def batches(self):
+        return OpenAIBatches(self.client)
+
+
+class OllamaChatBackend(LLMBackend):
+    """Local Ollama models through one persistent OllamaBackend session; supports logprob draws."""
+    provider = "ollama"
+
+    def __init__(self, model, temperature, **options):
+        super().__init__(model, temperature, **options)
+        # Keeps the model loaded, sends the temperature and stops reading an answer once it names a card
+        self.session = OllamaBackend(model, temperature)
+
+    def build_request(self, game_state):
+        request = {"model": self.model, "messages": self.build_messages(game_state)}
+        if self.constrained:
+            # Structured output: the answer must be a JSON object naming one of the 13 cards
+            request["format"] = card_schema
+        return request
+
+    async def complete(self, request):
+        return await self.session.chat(request["messages"], format=request.get("format"))
+
+    async def fetch_top_logprobs(self, game_state):
+        """Request the top logprobs of the first response token for one game state."""
+        messages = self.build_messages(game_state)
+        cache_key = DrawCache.key("ollama-logprobs", self.model, self.temperature, self.shot_type, messages)
+
+        async def complete():
+            return json.dumps(await self.limited(lambda: self.session.top_logprobs(messages)))
+
+        return json.loads(await cached_completion(self.draw_cache, cache_key, complete, self.temperature))
+
+
+llm_backends = {"anthropic": AnthropicBackend, "openai": OpenAIBackend, "ollama": OllamaChatBackend}
+
+
+def make_backend(name, model=None, temperature=1.0, replay_file=None, **options):
+    """Backend by name; LLM backends take the shot_type, dealer, constrained and draw_cache options."""
+    if name == "random":
+        return RandomBackend()
+    if name == "replay":
+        if not replay_file:
+            raise ValueError("The replay backend needs the results file to replay")
+        return ReplayBackend(replay_file)
+    if name not in llm_backends:
+        raise ValueError(f"Unknown backend {name!r}; expected one of {', '.join(backend_names)}")
+    return llm_backends[name](model, temperature, **options)
+
+
+def draw_modes(backend):
+    """Draw modes a backend (class or instance) supports besides the default one-request-per-draw."""
+    modes = ["wave"]
+    if backend.supports_batches:
+        modes += ["batch", "local-batch"]
+    if backend.fetch_top_logprobs is not None:
+        modes.append("logprobs")
+    return modes
+
+
+def declare_winner(player_hand_value, dealer_hand_value):
+    if player_hand_value > 21:
+        return "Dealer wins! Player busted."
+    elif dealer_hand_value > 21:
+        return "Player wins! Dealer busted."
+    elif player_hand_value > dealer_hand_value:
+        return "Player wins!"
+    elif dealer_hand_value > player_hand_value:
+        return "Dealer wins!"
+    else:
+        return "It's a tie!"
+
+
+class DealerEngine:
+    """Play blackjack games whose cards come from a backend, and collect their results.
+
+    The draw mode decides how fresh cards are requested: one request per draw
+    (''), lockstep waves ('wave'), waves sent as batch jobs ('batch', or
+    'local-batch' for the offline stand-in) or sampled from the model's
+    first-token probabilities once per state ('logprobs'). With `pool_after`,
+    a game state drawn that many times is resampled from its earlier draws.
+    `setup_descriptions` adds the prose descriptions the original Ollama script
+    put in its setup-draw game states. With a `game_log`, every finished game is
+    appended to it, and the games already in it are restored before play.
+    Results are kept as a constant-memory GameAggregate; `per_game_values` also
+    keeps the per-game final hand value lists for the results file. With a
+    SequentialMonitor, each finished game is fed to it and no new games start
+    once it has reached a decision.
+    """
+
+    def __init__(self, backend, draw_mode="", pool_after=0, concurrency=8, setup_descriptions=False,
+                 player_hit_upcards=llm_hit_upcards, verbose=True, game_log=None, per_game_values=False,
+                 monitor=None):
+        if draw_mode and draw_mode not in draw_modes(backend):
+            raise ValueError(f"The {backend.name} backend does not support draw mode {draw_mode!r}")
+        self.backend = backend
+        self.pool_after = pool_after
+        self.concurrency = concurrency
+        self.setup_descriptions = setup_descriptions
+        self.player_hit_upcards = player_hit_upcards
+        self.verbose = verbose
+        self.logprob_dealer = None
+        self.scheduler = None
+        if draw_mode == 'logprobs':
+            # Each distinct game state costs one request for the model's card
+            # probabilities, and draws are sampled from them locally
+            self.logprob_dealer = LogprobDealer(backend.fetch_top_logprobs, backend.query_card, backend.temperature,
+                                                state_key=canonical_state_key)
+        elif draw_mode == 'wave':
+            self.scheduler = WaveScheduler(gather_wave(backend.query_card))
+        elif draw_mode == 'batch':
+            self.scheduler = WaveScheduler(batch_wave(backend.batches(), backend.build_request, stats=backend.stats,
+                                                      poll_interval=backend.batch_poll_seconds))
+        elif draw_mode == 'local-batch':
+            self.scheduler = WaveScheduler(batch_wave(LocalBatches(), backend.build_request, poll_interval=0,
+                                                      stats=backend.stats))
+        # Cards drawn per canonical game state, written to the results for per-state analysis
+        self.draw_index = DrawIndex()
+        self.aggregate = GameAggregate()
+        self.player_final_hand_values = [] if per_game_values else None
+        self.dealer_final_hand_values = [] if per_game_values else None
+        self.games_requested = 0
+        self.interrupted = False
+        self.monitor = monitor
+        self.game_log = game_log
+        if game_log is not None:
+            self.restore(game_log.records)
+
+    def restore(self, records):
+        """Rebuild the collected data from game log records of earlier, finished games."""
+        for record in records:
+            for card in record["player_hand"]:
+                self.aggregate.player_cards.add(card)
+            for card in record["dealer_hand"]:
+                self.aggregate.dealer_cards.add(card)
+            for key, card, pooled in record["draws"]:
+                if not pooled:
+                    self.draw_index.observe(state_key_from_json(key), card)
+            self.record_game(record["player_hand_value"], record["dealer_hand_value"], record["result"],
+                             record["dealer_busted"], record["draws"])
+
+    async def request_card(self, game_state):
+        """Get a fresh card for a draw from the backend, through the selected draw mode."""
+        if self.logprob_dealer is not None:
+            return await self.logprob_dealer.draw(game_state)
+        if self.scheduler is not None:
+            return await self.scheduler.draw(game_state)
+        return await self.backend.query_card(game_state)
+
+    async def draw_card(self, game_state, draws):
+        """Draw a card for `game_state`, adding (state key, card, pooled) to the game's `draws`."""
+        key = canonical_state_key(game_state)
+        if self.pool_after and self.draw_index.total(key) >= self.pool_after:
+            # Enough draws of this state already: resample them instead of asking again
+            card = self.draw_index.sample(key)
+            draws.append((key, card, True))
+            return card
+        card = await self.request_card(game_state)
+        self.draw_index.observe(key, card)
+        draws.append((key, card, False))
+        return card
+
+    def setup_state(self, dealer_hand, description):
+        game_state = {"role": "Setup", "dealer_hand": dealer_hand, "player_hand": []}
+        if self.setup_descriptions:
+            game_state = {"role": "Setup", "description": description, "dealer_hand": dealer_hand, "player_hand": []}
+        return game_state
+
+    async def player_strategy(self, dealer_upcard, player_hand, dealer_hand, draws):
+        # The scripts' `dealer_upcard in range(2, 7)` branch compared a card name to
+        # ints and never fired, so the player only hits below 17 against `player_hit_upcards`
+        player_hand_value = player_hand.value
+        while player_hand_value < 17 and dealer_upcard in self.player_hit_upcards:
+            game_state = {
+                "role": "Player",
+                "player_hand": player_hand,
+                "dealer_hand": dealer_hand,
+                "dealer_upcard": dealer_upcard,
+                "player_hand_value": player_hand_value,
+            }
+            card = await self.draw_card(game_state, draws)
+            player_hand_value = player_hand.add(card)
+            self.aggregate.player_cards.add(card)
+        return player_hand_value
+
+    async def dealer_strategy(self, dealer_hand, player_hand, draws):
+        dealer_hand_value = dealer_hand.value
+        while dealer_hand_value < 17 or (dealer_hand_value == 17 and dealer_hand.has_ace):
+            game_state = {
+                "role": "Dealer",
+                "player_hand": player_hand,
+                "dealer_hand": dealer_hand,
+                "dealer_hand_value": dealer_hand_value,
+            }
+            card = await self.draw_card(game_state, draws)
+            dealer_hand_value = dealer_hand.add(card)
+            self.aggregate.dealer_cards.add(card)
+        return dealer_hand_value
+
+    async def play_game(self):
+        """Play one game and record its results."""
+        draws = []
+        dealer_setup = self.setup_state([], "Setting up dealer's initial hand")
+        dealer_hand = Hand([await self.draw_card(dealer_setup, draws), await self.draw_card(dealer_setup, draws)])
+        dealer_upcard = dealer_hand[0]
+        for card in dealer_hand:
+            self.aggregate.dealer_cards.add(card)
+
+        player_setup = self.setup_state(dealer_hand, "Setting up player's initial hand")
+        player_hand = Hand([await self.draw_card(player_setup, draws), await self.draw_card(player_setup, draws)])
+        for card in player_hand:
+            self.aggregate.player_cards.add(card)
+
+        player_hand_value = await self.player_strategy(dealer_upcard, player_hand, dealer_hand, draws)
+        if player_hand_value <= 21:
+            dealer_hand_value = await self.dealer_strategy(dealer_hand, player_hand, draws)
+        else:
+            dealer_hand_value = dealer_hand.value
+
+        result = declare_winner(player_hand_value, dealer_hand_value)
+        if "Player wins" in result:
+            winner = 'Player'
+        elif "Dealer wins" in result:
+            winner = 'Dealer'
+        else:
+            winner = 'Tie'
+        # The dealer only draws, and so can only bust, when the player stood
+        dealer_busted = player_hand_value <= 21 and dealer_hand_value > 21
+        self.record_game(player_hand_value, dealer_hand_value, winner, dealer_busted, draws)
+
+        if self.game_log is not None:
+            self.game_log.append({
+                "game": self.aggregate.num_games - 1,
+                "dealer_hand": list(dealer_hand),
+                "player_hand": list(player_hand),
+                "dealer_hand_value": dealer_hand_value,
+                "player_hand_value": player_hand_value,
+                "result": winner,
+                "dealer_busted": dealer_busted,
+                "draws": draws,
+            })
+
+        if self.verbose:
+            print("Game Details:")
+            print(f"  Dealer Hand: {dealer_hand}, Dealer Hand Value: {dealer_hand_value}")
+            print(f"  Player Hand: {player_hand}, Player Hand Value: {player_hand_value}")
+            print(f"  Result: {result}\n")
+
+    def record_game(self, player_hand_value, dealer_hand_value, winner, dealer_busted, draws):
+        self.aggregate.add_game(player_hand_value, dealer_hand_value, winner, dealer_busted)
+        if self.player_final_hand_values is not None:
+            self.player_final_hand_values.append(player_hand_value)
+            self.dealer_final_hand_values.append(dealer_hand_value)
+        if self.monitor is not None:
+            # Only fresh draws are evidence about the dealer; pooled ones resample them
+            self.monitor.observe([card for _, card, pooled in draws if not pooled], winner)
+
+    async def play(self, num_games=1000, desc="Running games"):
+        """Play up to `num_games` games in all, counting restored ones, keeping `concurrency` in flight at once.
+
+        Stops early once the sequential monitor, if any, has reached a decision.
+        Returns the failed count.
+        """
+        self.games_requested = num_games
+        remaining = num_games - self.aggregate.num_games
+        if remaining <= 0 or self.stopped():
+            return 0
+        return await run_games(self.play_game, remaining, self.concurrency, desc=desc, scheduler=self.scheduler,
+                               should_stop=self.stopped)
+
+    def stopped(self):
+        return self.monitor is not None and self.monitor.stopped
+
+    def run(self, num_games=1000):
+        """Play the games; on Ctrl-C, stop and keep the finished games for a partial summary."""
+        try:
+            asyncio.run(self.play(num_games))
+        except KeyboardInterrupt:
+            # asyncio.run cancels the games in flight before re-raising the interrupt
+            self.interrupted = True
+            print(f"\nInterrupted after {self.aggregate.num_games} of {num_games} games")
+        finally:
+            if self.game_log is not None:
+                self.game_log.close()
+        self.report()
+
+    def report(self):
+        """Print the sequential test outcome and the draw-mode, retry and cache counters of the run."""
+        if self.monitor is not None:
+            print(self.monitor)
+        if self.logprob_dealer is not None:
+            print(f"Logprob mode: {self.logprob_dealer.requests} requests for "
+                  f"{self.logprob_dealer.requests + self.logprob_dealer.reused} draws")
+        if isinstance(self.backend, LLMBackend):
+            print(self.backend.stats)
+        draw_cache = self.backend.draw_cache
+        if draw_cache is not None:
+            print(f"Draw cache: {draw_cache.hits} responses reused, {draw_cache.misses} requested")
+
+    def results(self, llm_name, shot_type, temperature):
+        """Results in the format every driver writes, for analysis and comparison."""
+        # Rates are over the games that finished; failed games are skipped by run_games
+        results = {"llm_name": llm_name, "shot_type": shot_type, "temperature": temperature,
+                   "provider": self.backend.name}
+        if isinstance(self.backend, LLMBackend):
+            results["dealer"] = self.backend.dealer
+        results.update(self.aggregate.to_results(self.player_final_hand_values, self.dealer_final_hand_values))
+        if self.logprob_dealer is not None:
+            # The memoized per-state card distributions, for analysis
+            results["state_card_distributions"] = self.logprob_dealer.snapshot()
+        results["state_draw_counts"] = self.draw_index.to_dict()
+        results["draw_stats"] = self.backend.stats.to_dict()
+        if self.monitor is not None:
+            results["sequential"] = self.monitor.to_dict(self.aggregate.num_games)
+        if self.interrupted:
+            results["partial"] = True
+            results["games_requested"] = self.games_requested
+        return results
+
+
+def print_metrics(results):
+    llm_name, metrics = results["llm_name"], results["metrics"]
+    print(f"{llm_name} - Player Win Rate: {metrics['player_win_rate']:.3f}%")
+    print(f"{llm_name} - Dealer Bust Rate: {metrics['dealer_bust_rate']:.3f}%")
+    print(f"{llm_name} - Average Player Hand Value: {metrics['average_player_hand_value']:.2f}")
+    print(f"{llm_name} - Average Dealer Hand Value: {metrics['average_dealer_hand_value']:.2f}")
+
+
+def plot_results(results, dealer="honest"):
+    """Show the final hand value histogram, card frequencies and win rates of a run."""
+    model_name, shot_type, temperature = results["llm_name"], results["shot_type"], results["temperature"]
+    num_games = sum(results["win_record"].values())
+    setting = f"{'Deceptive Dealer, ' if dealer == 'deceptive' else ''}{shot_type.capitalize()} Shot"
+
+    plt.figure(figsize=(10, 5))
+    for side in ("Player", "Dealer"):
+        counts = results[f"{side.lower()}_final_hand_value_counts"]
+        plt.hist([int(value) for value in counts], bins=range(10, 31), weights=list(counts.values()), alpha=0.5,
+                 label=f'{side} Hand Values')
+    plt.xlabel('Final Hand Value')
+    plt.ylabel('Frequency')
+    plt.legend()
+    plt.title(f'Distribution of Final Hand Values over {num_games} Games ({model_name}) - {setting}, Temp {temperature}')
+    plt.show()
+
+    fig, ax = plt.subplots(1, 2, figsize=(14, 5))
+    for axis, side in zip(ax, ("Player", "Dealer")):
+        frequencies = results[f"{side.lower()}_card_frequencies"]
+        axis.bar(frequencies.keys(), frequencies.values())
+        axis.set_title(f'{side} Card Draw Frequencies ({model_name}) - {setting}')
+        axis.set_xlabel('Card')
+        axis.set_ylabel('Frequency')
+    plt.suptitle(f'Card Frequencies ({model_name}) - {setting}, Temp {temperature}')
+    plt.tight_layout(rect=[0, 0, 1, 0.96])
+    plt.show()
+
+    win_record = results["win_record"]
+    plt.figure(figsize=(7, 7))
+    plt.pie(list(win_record.values()), labels=list(win_record.keys()), autopct='%1.1f%%', startangle=140)
+    plt.title(f'Win Rate Over {num_games} Games ({model_name}) - {setting}, Temp {temperature}')
+    plt.show()
+
+
+def build_engine(backend_name, model=None, temperature=1.0, shot_type="zero", dealer="honest", concurrency=8,
+                 draw_mode="", draw_cache=None, constrained=False, pool_after=0, setup_descriptions=False,
+                 replay_file=None, request_slots=None, verbose=True, game_log=None, per_game_values=False,
+                 monitor=None):
+    """A DealerEngine over a new backend with these settings."""
+    options = {}
+    if backend_name in llm_backends:
+        options = {"shot_type": shot_type, "dealer": dealer, "constrained": constrained, "draw_cache": draw_cache,
+                   "request_slots": request_slots, "verbose": verbose}
+    backend = make_backend(backend_name, model, temperature, replay_file=replay_file, **options)
+    return DealerEngine(backend, draw_mode, pool_after, concurrency, setup_descriptions, verbose=verbose,
+                        game_log=game_log, per_game_values=per_game_values, monitor=monitor)
+
+
+def open_game_log(results_path, backend_name, model, temperature, shot_type, dealer, draw_mode, pool_after,
+                  resume=False):
+    """The game log next to `results_path`, headed with the settings a resumed run must match."""
+    settings = {"backend": backend_name, "model": model, "temperature": temperature, "shot_type": shot_type,
+                "dealer": dealer, "draw_mode": draw_mode, "pool_after": pool_after}
+    return GameLog(game_log_path(results_path), settings, resume)
+
+
+def sequential_monitor(stop_alpha=None, win_rate_precision=None, min_games=50, card_precision=3.0):
+    """A SequentialMonitor for these stopping settings, or None when neither rule is on.
+
+    `stop_alpha` turns on the card test at that level, settled either way or
+    once every rank is known within `card_precision` points; `win_rate_precision`
+    (percentage points) stops once the win rate is known that closely, at
+    `stop_alpha` or 0.05.
+    """
+    if stop_alpha is None and win_rate_precision is None:
+        return None
+    if stop_alpha is not None and not 0 < stop_alpha < 1:
+        raise ValueError("The stopping significance level must be between 0 and 1")
+    if (win_rate_precision is not None and win_rate_precision <= 0) or card_precision <= 0:
+        raise ValueError("Stopping precisions must be positive")
+    return SequentialMonitor(stop_alpha or 0.05, min_games, card_test=stop_alpha is not None,
+                             card_precision=card_precision, win_rate_precision=win_rate_precision)
+
+
+def run_dealer(backend_name, model=None, temperature=1.0, shot_type="zero", dealer="honest", num_games=1000,
+               concurrency=8, draw_mode="", cache_mode="", constrained=False, pool_after=0, setup_descriptions=False,
+               replay_file=None, results_path=None, resume=False, per_game_values=False, monitor=None):
+    """Build a backend and engine, play `num_games` games and return the results dict.
+
+    With `results_path`, finished games are logged next to it as they end, and
+    with `resume` a run picks up from the games already in that log.
+    `per_game_values` adds the per-game final hand value lists to the results.
+    With a SequentialMonitor the run may stop before `num_games`.
+    """
+    # Disk cache of raw responses, so re-runs can replay draws instead of paying for them again
+    draw_cache = open_draw_cache(cache_mode)
+    game_log = None
+    if results_path:
+        game_log = open_game_log(results_path, backend_name, model, temperature, shot_type, dealer, draw_mode,
+                                 pool_after, resume)
+    engine = build_engine(backend_name, model, temperature, shot_type, dealer, concurrency, draw_mode, draw_cache,
+                          constrained, pool_after, setup_descriptions, replay_file, game_log=game_log,
+                          per_game_values=per_game_values, monitor=monitor)
+    engine.run(num_games)
+    return engine.results(model or backend_name, shot_type, temperature)
+
+
+def save_results(results, filename):
+    """Write a results file and add the run to the results catalog."""
+    with open(filename, "w") as file:
+        json.dump(results, file)
+    catalog_results(filename, results)
+
+
+def run_script(provider, dealer):
+    """Interactive driver: ask for the run settings, play 1000 games, save and plot the results."""
+    parser = argparse.ArgumentParser(description=f"Play 1000 blackjack games dealt by an {provider} model.")
+    parser.add_argument("--resume", action="store_true",
+                        help="Continue an interrupted run with the same settings from its game log.")
+    args = parser.parse_args()
+    modes = draw_modes(llm_backends[provider])
+    model_name = input(f"Enter the LLM model name (e.g., '{example_models[provider]}'): ")
+    temperature = float(input("Enter the temperature setting (e.g., 0.5): "))
+    shot_type = input("Enter 'few' for few-shot or 'zero' for zero-shot prompting: ").strip().lower()
+    concurrency = int(input("Enter the number of games to run concurrently (e.g., 8): ") or 8)
+    draw_mode = input(f"Enter a draw mode ({', '.join(modes)}), or press Enter to request every draw on its own: ").strip().lower()
+    cache_mode = input("Enter a draw cache mode ('record', 'replay' or 'cache-first'), or press Enter for none: ").strip().lower()
+    constrained = input("Enter 'y' to constrain answers to the 13 card names, or press Enter for free text: ").strip().lower() == 'y'
+    pool_after = int(input("Enter how many draws of a repeated game state to collect before resampling them "
+                           "instead of asking again, or press Enter to always ask: ") or 0)
+    stop_alpha = input("Enter a significance level (e.g., 0.05) to stop once the card distribution test is settled, "
+                       "or press Enter to play all 1000 games: ").strip()
+    monitor = sequential_monitor(float(stop_alpha)) if stop_alpha else None
+
+    setup_descriptions = script_outputs[(provider, dealer)][1]
+    output = results_filename(provider, dealer, model_name, temperature, shot_type)
+    results = run_dealer(provider, model_name, temperature, shot_type, dealer, 1000, concurrency, draw_mode,
+                         cache_mode, constrained, pool_after, setup_descriptions, results_path=output,
+                         resume=args.resume, per_game_values=True, monitor=monitor)
+    print_metrics(results)
+    save_results(results, output)
+    if results.get("partial"):
+        print(f"Partial results written to {output}; run again with --resume to finish")
+        return
+    plot_results(results, dealer)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Play blackjack games dealt by a random, replayed or LLM dealer.")
+    parser.add_argument("--backend", choices=backend_names, default="random", help="Where the cards come from.")
+    parser.add_argument("--model", help="Model name for the LLM backends.")
+    parser.add_argument("--temperature", type=float, default=1.0)
+    parser.add_argument("--shot-type", choices=("zero", "few"), default="zero")
+    parser.add_argument("--dealer", choices=("honest", "deceptive"), default="honest", help="Dealer prompt variant.")
+    parser.add_argument("--games", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=8, help="Games in flight at once.")
+    parser.add_argument("--draw-mode", default="", help="'wave', 'batch', 'local-batch' or 'logprobs'.")
+    parser.add_argument("--cache-mode", default="", help="Draw cache mode: 'record', 'replay' or 'cache-first'.")
+    parser.add_argument("--constrained", action="store_true", help="Constrain answers to the 13 card names.")
+    parser.add_argument("--pool-after", type=int, default=0,
+                        help="Resample a game state's earlier draws once it has this many.")
+    parser.add_argument("--replay-file", help="Results file the replay backend resamples.")
+    parser.add_argument("--output", help="Results file to write (default: named after the run settings).")
+    parser.add_argument("--plot", action="store_true", help="Show the result plots.")
+    parser.add_argument("--per-game-values", action="store_true",
+                        help="Also write the per-game final hand value lists (the histograms are always written).")
+    parser.add_argument("--resume", action="store_true",
+                        help="Continue an interrupted run with the same settings from its game log.")
+    parser.add_argument("--stop-alpha", type=float,
+                        help="Stop early once a sequential test of the card distribution against a uniform deck "
+                             "is settled at this significance level (e.g. 0.05).")
+    parser.add_argument("--win-rate-precision", type=float,
+                        help="Stop early once the always-valid win rate interval is within this many "
+                             "percentage points either side.")
+    parser.add_argument("--card-precision", type=float, default=3.0,
+                        help="With --stop-alpha, also stop once every card rank's share is known within this many "
+                             "percentage points of a uniform deck.")
+    parser.add_argument("--min-games", type=int, default=50, help="Games before any early stop.")
+    args = parser.parse_args()
+    if args.backend in llm_backends and not args.model:
+        parser.error(f"--model is required for the {args.backend} backend")
+    if args.games <= 0:
+        parser.error("--games must be positive")
+
+    output = args.output or results_filename(args.backend, args.dealer, args.model or args.backend,
+                                             args.temperature, args.shot_type)
+    try:
+        monitor = sequential_monitor(args.stop_alpha, args.win_rate_precision, args.min_games, args.card_precision)
+        results = run_dealer(args.backend, args.model, args.temperature, args.shot_type, args.dealer, args.games,
+                             args.concurrency, args.draw_mode, args.cache_mode, args.constrained, args.pool_after,
+                             replay_file=args.replay_file, results_path=output, resume=args.resume,
+                             per_game_values=args.per_game_values, monitor=monitor)
+    except ValueError as error:
+        parser.error(str(error))
+    print_metrics(results)
+    save_results(results, output)
+    print(f"{'Partial results' if results.get('partial') else 'Results'} written to {output}")
+    if args.plot:
+        plot_results(results, args.dealer)
@@ -1,4 +1,11 @@
+import argparse
 import json
+import os
+import numpy as np
+import matplotlib.pyplot as plt
+from distributions import card_counts, final_value_counts, normalize, divergences as divergence_functions
+from results_catalog import ResultsCatalog
+from resampling import compare_grid, distribution_names
 
 files = {
     "baseline_data": "random_blackjack_results.json",
@@ -6,134 +13,137 @@ files = {
     "llama3.1_fewshot_temp0.5": "llama3.1_fewshot_temp0.5.json"
 }
 
-def load_and_analyze_json(file_path):
-    with open(file_path, 'r') as file:
-        data = json.load(file)
-
-    print(f"Columns in {file_path.split('/')[-1]}:")
-    for key in data.keys():
-        print(f" - {key}")
-
-    print("\nSample data from each column:")
-    for key, value in data.items():
-        print(f"Column: {key}")
-        print(f" - Type: {type(value)}")
-        # Display a sample of data
-        if isinstance(value, dict):  # Card frequencies
-            print(f" - Sample data (first 3 items): {dict(list(value.items())[:3])}")
-        elif isinstance(value, list):  # Final hand values
-            print(f" - Sample data (first 5 items): {value[:5]}")
-        else:
-            print(f" - Value: {value}")
-        print()
-
-for file_name, file_path in files.items():
-    print(f"\nAnalyzing file: {file_name}")
-    load_and_analyze_json(file_path)
-
-import json
-import numpy as np
-from scipy.special import kl_div
-
-# Load JSON data
-def load_json_data(file_path):
-    with open(file_path, 'r') as file:
-        return json.load(file)
-
-# Normalize frequencies to form probability distributions
-def normalize_frequencies(frequencies):
-    total = sum(frequencies.values())
-    return {key: count / total for key, count in frequencies.items()}
-
-# Calculate KL Divergence between two distributions
-def calculate_kl_divergence(dist1, dist2, epsilon=1e-10):
-    # Ensure both distributions have the same keys by filling missing values with epsilon
-    all_keys = set(dist1.keys()).union(set(dist2.keys()))
-    p = np.array([dist1.get(key, epsilon) for key in all_keys])
-    q = np.array([dist2.get(key, epsilon) for key in all_keys])
-
-    # Normalize distributions to ensure they sum to 1
-    p /= p.sum()
-    q /= q.sum()
-
-    # Calculate KL Divergence using scipy's kl_div function
-    return np.sum(kl_div(p, q))
-
-# Load data
-baseline_data = load_json_data(files["baseline_data"])
-deceptive_data = load_json_data(files["llama3.1_fewshot_temp_0.5_deceptive"])
-fewshot_data = load_json_data(files["llama3.1_fewshot_temp0.5"])
-
-# Normalize player and dealer frequencies
-baseline_player = normalize_frequencies(baseline_data["player_card_frequencies"])
-baseline_dealer = normalize_frequencies(baseline_data["dealer_card_frequencies"])
-
-deceptive_player = normalize_frequencies(deceptive_data["player_card_frequencies"])
-deceptive_dealer = normalize_frequencies(deceptive_data["dealer_card_frequencies"])
-
-fewshot_player = normalize_frequencies(fewshot_data["player_card_frequencies"])
-fewshot_dealer = normalize_frequencies(fewshot_data["dealer_card_frequencies"])
-
-# Calculate KL Divergence for each comparison
-print("KL Divergence Results:")
-
-# 1. Baseline vs Fewshot
-kl_player_baseline_fewshot = calculate_kl_divergence(baseline_player, fewshot_player)
-kl_dealer_baseline_fewshot = calculate_kl_divergence(baseline_dealer, fewshot_dealer)
-print(f"1. Baseline vs Non-Deceptive- Player: {kl_player_baseline_fewshot}, Dealer: {kl_dealer_baseline_fewshot}")
-
-# 2. Baseline vs Deceptive
-kl_player_baseline_deceptive = calculate_kl_divergence(baseline_player, deceptive_player)
-kl_dealer_baseline_deceptive = calculate_kl_divergence(baseline_dealer, deceptive_dealer)
-print(f"2. Baseline vs Deceptive - Player: {kl_player_baseline_deceptive}, Dealer: {kl_dealer_baseline_deceptive}")
-
-# 3. Deceptive vs Fewshot
-kl_player_deceptive_fewshot = calculate_kl_divergence(deceptive_player, fewshot_player)
-kl_dealer_deceptive_fewshot = calculate_kl_divergence(deceptive_dealer, fewshot_dealer)
-print(f"3. Deceptive vs Non-Deceptive - Player: {kl_player_deceptive_fewshot}, Dealer: {kl_dealer_deceptive_fewshot}")
-
-# Convert list of values into frequency distribution
-def list_to_frequency_distribution(value_list):
-    freq_dict = {}
-    for value in value_list:
-        freq_dict[value] = freq_dict.get(value, 0) + 1
-    return freq_dict
-
-# Convert final hand values into frequency distributions
-baseline_player_final = normalize_frequencies(list_to_frequency_distribution(baseline_data["player_final_hand_values"]))
-baseline_dealer_final = normalize_frequencies(list_to_frequency_distribution(baseline_data["dealer_final_hand_values"]))
-
-deceptive_player_final = normalize_frequencies(list_to_frequency_distribution(deceptive_data["player_final_hand_values"]))
-deceptive_dealer_final = normalize_frequencies(list_to_frequency_distribution(deceptive_data["dealer_final_hand_values"]))
-
-fewshot_player_final = normalize_frequencies(list_to_frequency_distribution(fewshot_data["player_final_hand_values"]))
-fewshot_dealer_final = normalize_frequencies(list_to_frequency_distribution(fewshot_data["dealer_final_hand_values"]))
-
-# Calculate KL Divergence for each comparison of final hand values
-# 1. Baseline vs Fewshot
-kl_player_baseline_fewshot_final = calculate_kl_divergence(baseline_player_final, fewshot_player_final)
-kl_dealer_baseline_fewshot_final = calculate_kl_divergence(baseline_dealer_final, fewshot_dealer_final)
-
-# 2. Baseline vs Deceptive
-kl_player_baseline_deceptive_final = calculate_kl_divergence(baseline_player_final, deceptive_player_final)
-kl_dealer_baseline_deceptive_final = calculate_kl_divergence(baseline_dealer_final, deceptive_dealer_final)
-
-# 3. Deceptive vs Fewshot
-kl_player_deceptive_fewshot_final = calculate_kl_divergence(deceptive_player_final, fewshot_player_final)
-kl_dealer_deceptive_fewshot_final = calculate_kl_divergence(deceptive_dealer_final, fewshot_dealer_final)
-
-# Storing the results
-kl_player_baseline_fewshot_final, kl_dealer_baseline_fewshot_final, kl_player_baseline_deceptive_final, kl_dealer_baseline_deceptive_final, kl_player_deceptive_fewshot_final, kl_dealer_deceptive_fewshot_final
-
-# Printing the KL divergence values with descriptive sentences
-
-print("KL Divergence Results for Final Hand Values:\n")
-
-# 1. Baseline vs Fewshot
-print(f"1. Baseline vs Non-Deceptive Dealer - Player Final: {kl_player_baseline_fewshot_final:.4f}, Dealer Final: {kl_dealer_baseline_fewshot_final:.4f}")
-
-# 2. Baseline vs Deceptive
-print(f"2. Baseline vs Deceptive - Player Final: {kl_player_baseline_deceptive_final:.4f}, Dealer Final: {kl_dealer_baseline_deceptive_final:.4f}")
-
-# 3. Deceptive vs Fewshot
-print(f"3. Deceptive vs Non-Deceptive Dealer - Player Final: {kl_player_deceptive_fewshot_final:.4f}, Dealer Final: {kl_dealer_deceptive_fewshot_final:.4f}")
\ No newline at end of file
+# Distributions compared between every pair of runs (distribution_names): card
+# frequencies (13 ranks) and final hand values (value bins), for the player and the dealer
+divergence_names = tuple(divergence_functions)
+
+
+def run_label(row):
+    return os.path.splitext(os.path.basename(row["path"]))[0]
+
+
+def load_matrices(rows):
+    """Stack the runs' catalog summaries into aligned count matrices, one column per run.
+
+    Card matrices are 13 ranks x N, in rank-code order; final hand value
+    matrices are 28 values (4 to 31) x N.
+    """
+    columns = {name: [] for name in distribution_names}
+    for row in rows:
+        summary = json.loads(row["summary"])
+        for side in ("player", "dealer"):
+            columns[f"{side}_cards"].append(card_counts(summary[f"{side}_card_frequencies"]))
+            columns[f"{side}_values"].append(final_value_counts(summary, side))
+    return {name: np.column_stack(counts) for name, counts in columns.items()}
+
+
+def pairwise_divergences(counts, pseudo_count=0.5):
+    """KL, Jensen-Shannon, total variation and chi-square between every pair of columns of `counts`.
+
+    Returns divergence name -> N x N matrix whose [i, j] entry compares run i
+    (P) with run j (Q); KL and chi-square are not symmetric. Each run's counts
+    are smoothed with `pseudo_count` per bin before normalizing, so KL and
+    chi-square stay finite. Pairs are computed at once on an N x N x bins array.
+    """
+    p = normalize(counts.T, pseudo_count)
+    return {name: divergence(p[:, None, :], p[None, :, :]) for name, divergence in divergence_functions.items()}
+
+
+def divergence_matrices(matrices, pseudo_count=0.5):
+    """(distribution, divergence) -> N x N matrix for every distribution in `matrices`."""
+    return {(name, divergence): matrix for name in distribution_names
+            for divergence, matrix in pairwise_divergences(matrices[name], pseudo_count).items()}
+
+
+def significance_matrices(grid, num_runs):
+    """Permutation p-values and bootstrap interval bounds of every divergence as N x N matrices.
+
+    `grid` is resampling.compare_grid output; a run compared with itself gets
+    p = 1 and a zero interval.
+    """
+    matrices = {}
+    for name in distribution_names:
+        for divergence in divergence_names:
+            p_values = np.ones((num_runs, num_runs))
+            low, high = np.zeros((num_runs, num_runs)), np.zeros((num_runs, num_runs))
+            for (i, j), comparison in grid.items():
+                result = comparison[f"{name}_{divergence}"]
+                p_values[i, j] = p_values[j, i] = result["p_value"]
+                # Intervals are of D(run i || run j); the asymmetric divergences fill only that side
+                low[i, j], high[i, j] = result["interval"]
+                if divergence in ("js", "tv"):
+                    low[j, i], high[j, i] = result["interval"]
+            matrices[f"{name}_{divergence}_p"] = p_values
+            matrices[f"{name}_{divergence}_low"] = low
+            matrices[f"{name}_{divergence}_high"] = high
+    return matrices
+
+
+def save_matrices(path, labels, paths, divergences, significance=None):
+    """Write the labels, file paths, every divergence matrix and any significance matrices to one .npz file."""
+    np.savez(path, labels=np.array(labels), paths=np.array(paths),
+             **{f"{name}_{divergence}": matrix for (name, divergence), matrix in divergences.items()},
+             **(significance or {}))
+
+
+def plot_heatmaps(path, labels, divergences, divergence="js"):
+    """Save a 2 x 2 grid of heatmaps of one divergence, one panel per distribution."""
+    size = max(6, 0.35 * len(labels) + 3)
+    fig, axes = plt.subplots(2, 2, figsize=(2 * size, 2 * size))
+    for axis, name in zip(axes.ravel(), distribution_names):
+        image = axis.imshow(divergences[(name, divergence)], cmap="viridis")
+        axis.set_title(f"{divergence.upper()} - {name.replace('_', ' ').title()}")
+        axis.set_xticks(range(len(labels)), labels, rotation=90, fontsize=7)
+        axis.set_yticks(range(len(labels)), labels, fontsize=7)
+        fig.colorbar(image, ax=axis, fraction=0.046, pad=0.04)
+    fig.suptitle(f"Pairwise {divergence.upper()} divergence over {len(labels)} runs (row P vs column Q)")
+    fig.tight_layout()
+    fig.savefig(path, dpi=120)
+    plt.close(fig)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="All-pairs divergences between the card and final hand value "
+                                                 "distributions of many runs.")
+    parser.add_argument("paths", nargs="*", help="Results files to compare (default: the baseline and two "
+                                                 "llama3.1 runs in `files`).")
+    parser.add_argument("--cataloged", action="store_true", help="Compare every run in the results catalog.")
+    parser.add_argument("--workers", type=int, default=None, help="Processes parsing new or changed files.")
+    parser.add_argument("--output", default="distribution_shifts.npz", help="Matrix file to write.")
+    parser.add_argument("--heatmap", help="Also save heatmaps of one divergence to this image file.")
+    parser.add_argument("--metric", choices=divergence_names, default="js", help="Divergence shown in the heatmap.")
+    parser.add_argument("--pseudo-count", type=float, default=0.5,
+                        help="Count added to every bin of every run before comparing (0.5: Jeffreys' prior).")
+    parser.add_argument("--replicates", type=int, default=0,
+                        help="Also compute permutation p-values and bootstrap intervals of every divergence "
+                             "with this many replicates (e.g. 10000).")
+    parser.add_argument("--seed", type=int, default=None, help="Seed for the resampling.")
+    args = parser.parse_args()
+    if args.pseudo_count < 0:
+        parser.error("--pseudo-count must not be negative")
+    if args.replicates < 0:
+        parser.error("--replicates must not be negative")
+
+    catalog = ResultsCatalog()
+    if args.cataloged:
+        rows = catalog.runs()
+    else:
+        # Each file is parsed once, when it is first cataloged or has changed since;
+        # the comparison reads the catalog's stored summaries, not the per-game lists
+        rows = catalog.ingest(args.paths or list(files.values()), args.workers)
+    if len(rows) < 2:
+        parser.error("Need at least two runs to compare")
+
+    labels = [run_label(row) for row in rows]
+    divergences = divergence_matrices(load_matrices(rows), args.pseudo_count)
+    significance = None
+    if args.replicates:
+        grid = compare_grid([json.loads(row["summary"]) for row in rows], args.replicates,
+                            pseudo_count=args.pseudo_count, seed=args.seed, workers=args.workers)
+        significance = significance_matrices(grid, len(rows))
+    save_matrices(args.output, labels, [row["path"] for row in rows], divergences, significance)
+    print(f"Compared {len(rows)} runs; {len(divergences)} divergence matrices"
+          f"{' with p-values and intervals' if significance else ''} written to {args.output}")
+    if args.heatmap:
+        plot_heatmaps(args.heatmap, labels, divergences, args.metric)
+        print(f"{args.metric.upper()} heatmaps written to {args.heatmap}")
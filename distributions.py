@@ -0,0 +1,93 @@
+"""Card and final hand value distributions as fixed-index NumPy arrays.
+
+Every distribution has the same bins in the same order whatever the input:
+the 13 ranks in rank-code order, and final hand values 4 (two 2s) to 31.
+Counts come from raw per-game lists (one np.bincount) or from stored
+histograms, so comparing runs costs O(bins), not O(games).
+"""
+import numpy as np
+from cards import valid_cards, card_codes
+
+rank_index = np.arange(len(valid_cards))
+min_hand_value = 4
+max_hand_value = 31
+value_index = np.arange(min_hand_value, max_hand_value + 1)
+
+
+def card_counts(cards):
+    """Counts per rank from a card -> count dict or a sequence of card names."""
+    counts = np.zeros(len(valid_cards))
+    if isinstance(cards, dict):
+        for card, count in cards.items():
+            counts[card_codes[card]] += count
+        return counts
+    codes = np.fromiter((card_codes[card] for card in cards), dtype=np.intp)
+    return counts + np.bincount(codes, minlength=len(valid_cards))
+
+
+def value_counts(values):
+    """Counts per final hand value (value_index bins) from a value -> count dict or a sequence of values."""
+    counts = np.zeros(len(value_index))
+    if isinstance(values, dict):
+        for value, count in values.items():
+            counts[int(value) - min_hand_value] += count
+        return counts
+    values = np.asarray(values, dtype=np.intp)
+    if values.size and (values.min() < min_hand_value or values.max() > max_hand_value):
+        raise ValueError(f"Final hand values must lie in {min_hand_value}..{max_hand_value}")
+    return counts + np.bincount(values - min_hand_value, minlength=len(value_index))
+
+
+def final_value_counts(results, side):
+    """Final hand value counts of one side ("player" or "dealer") of a results dict or summary.
+
+    Uses the stored histogram when there is one and the per-game list otherwise.
+    """
+    histogram = results.get(f"{side}_final_hand_value_counts")
+    if histogram is not None:
+        return value_counts(histogram)
+    return value_counts(results[f"{side}_final_hand_values"])
+
+
+def normalize(counts, pseudo_count=0.0):
+    """Probabilities from counts along the last axis, after adding `pseudo_count` to every bin.
+
+    A positive pseudo-count (0.5 is Jeffreys' prior, 1 Laplace's) keeps every
+    bin non-zero, which KL and chi-square need to stay finite.
+    """
+    counts = np.asarray(counts, dtype=float) + pseudo_count
+    totals = counts.sum(axis=-1, keepdims=True)
+    if np.any(totals <= 0):
+        raise ValueError("Cannot normalize a distribution with no counts")
+    return counts / totals
+
+
+# The divergences below take probability arrays with bins on the last axis and
+# broadcast over the others, so p[:, None, :] against p[None, :, :] gives all pairs
+
+
+def kl_divergence(p, q):
+    """KL(P || Q); bins where P is 0 contribute nothing, bins where only Q is 0 make it infinite."""
+    with np.errstate(divide="ignore", invalid="ignore"):
+        terms = np.where(p > 0, p * np.log(p / q), 0.0)
+    return terms.sum(axis=-1)
+
+
+def js_divergence(p, q):
+    """Jensen-Shannon divergence (natural log, so at most ln 2); finite for any P and Q."""
+    m = 0.5 * (p + q)
+    return 0.5 * (kl_divergence(p, m) + kl_divergence(q, m))
+
+
+def total_variation(p, q):
+    return 0.5 * np.abs(p - q).sum(axis=-1)
+
+
+def chi_square(p, q):
+    """Pearson chi-square divergence of P from Q, sum (p - q)^2 / q."""
+    with np.errstate(divide="ignore", invalid="ignore"):
+        terms = np.where(p != q, (p - q) ** 2 / q, 0.0)
+    return terms.sum(axis=-1)
+
+
+divergences = {"kl": kl_divergence, "js": js_divergence, "tv": total_variation, "chi2": chi_square}
@@ -0,0 +1,138 @@
+import hashlib
+import json
+import random
+import sqlite3
+import time
+from collections import defaultdict
+
+cache_modes = ("record", "replay", "cache-first")
+
+
+class DrawCache:
+    """SQLite-backed record/replay cache of raw LLM responses to card-draw prompts.
+
+    Responses are stored per request key (provider, model, temperature, shot type
+    and the exact prompt), several per key, in the order they were recorded.
+
+    - record: every call goes to the provider and its response is stored.
+    - replay: responses are served from the cache in recorded order, one per call,
+      and a prompt with no unused response left raises LookupError; no network.
+    - cache-first: at temperature 0, where the answer is deterministic, a stored
+      response is reused and only misses are sent; otherwise as record.
+
+    The cache holds at most `max_entries` responses; the least recently used
+    ones are evicted first.
+    """
+
+    def __init__(self, path="draw_cache.sqlite", mode="record", max_entries=1_000_000):
+        if mode not in cache_modes:
+            raise ValueError(f"Unknown draw cache mode {mode!r}; expected one of {', '.join(cache_modes)}")
+        self.mode = mode
+        self.max_entries = max_entries
+        self.connection = sqlite3.connect(path)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "id INTEGER PRIMARY KEY AUTOINCREMENT, key TEXT NOT NULL, response TEXT NOT NULL, last_used REAL NOT NULL)")
+        self.connection.execute("CREATE INDEX IF NOT EXISTS responses_key ON responses (key, id)")
+        self.connection.execute("CREATE INDEX IF NOT EXISTS responses_last_used ON responses (last_used)")
+        self.connection.commit()
+        self.size = self.connection.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+        # Replay position per key, so repeated prompts get successive recorded responses
+        self.replay_offsets = defaultdict(int)
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(provider, model, temperature, shot_type, prompt):
+        """Stable hash of everything that determines a response."""
+        try:
+            temperature = float(temperature)
+        except (TypeError, ValueError):
+            pass
+        payload = json.dumps([provider, model, temperature, shot_type, prompt], sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def lookup(self, key):
+        """Return a cached response for `key` under the current mode, or None."""
+        if self.mode == "replay":
+            row = self.connection.execute(
+                "SELECT id, response FROM responses WHERE key = ? ORDER BY id LIMIT 1 OFFSET ?",
+                (key, self.replay_offsets[key])).fetchone()
+            if row is not None:
+                self.replay_offsets[key] += 1
+        else:
+            row = self.connection.execute(
+                "SELECT id, response FROM responses WHERE key = ? ORDER BY id DESC LIMIT 1", (key,)).fetchone()
+        if row is None:
+            return None
+        self.connection.execute("UPDATE responses SET last_used = ? WHERE id = ?", (time.time(), row[0]))
+        self.connection.commit()
+        return row[1]
+
+    def store(self, key, response):
+        """Record one response, evicting the least recently used entries beyond `max_entries`."""
+        self.connection.execute("INSERT INTO responses (key, response, last_used) VALUES (?, ?, ?)",
+                                (key, response, time.time()))
+        self.size += 1
+        if self.size > self.max_entries:
+            self.connection.execute(
+                "DELETE FROM responses WHERE id IN (SELECT id FROM responses ORDER BY last_used LIMIT ?)",
+                (self.size - self.max_entries,))
+            self.size = self.max_entries
+        self.connection.commit()
+
+    async def get_or_call(self, key, call, temperature):
+        """Return the response for `key`, calling `call()` (an async function returning text) when needed."""
+        use_cache = self.mode == "replay" or (self.mode == "cache-first" and is_zero(temperature))
+        if use_cache:
+            response = self.lookup(key)
+            if response is not None:
+                self.hits += 1
+                return response
+            if self.mode == "replay":
+                raise LookupError("No recorded response left for this prompt; replay mode makes no API calls")
+        self.misses += 1
+        response = await call()
+        self.store(key, response)
+        return response
+
+    def close(self):
+        self.connection.close()
+
+
+def is_zero(temperature):
+    try:
+        return float(temperature) == 0
+    except (TypeError, ValueError):
+        return False
+
+
+def open_draw_cache(mode, path="draw_cache.sqlite", max_entries=1_000_000):
+    """Open a DrawCache for `mode`, or return None when `mode` is empty (no caching)."""
+    if not mode:
+        return None
+    return DrawCache(path, mode, max_entries)
+
+
+async def cached_completion(draw_cache, key, call, temperature):
+    """Run `call()` through `draw_cache` when there is one, otherwise call it directly."""
+    if draw_cache is None:
+        return await call()
+    return await draw_cache.get_or_call(key, call, temperature)
+
+
+def cached_fallback(draw_cache, key, choices):
+    """Pick a random fallback card, recorded alongside the responses so a replay makes the same pick."""
+    if draw_cache is None:
+        return random.choice(choices)
+    fallback_key = key + ":fallback"
+    if draw_cache.mode == "replay":
+        card = draw_cache.lookup(fallback_key)
+        if card is None:
+            raise LookupError("No recorded fallback card left for this prompt")
+        return card
+    card = random.choice(choices)
+    draw_cache.store(fallback_key, card)
+    return card
@@ -0,0 +1,23 @@
+class DrawStats:
+    """Counts of how many LLM draws needed retries or fell back to a random card."""
+
+    def __init__(self):
+        self.draws = 0
+        self.retries = 0
+        self.retried_draws = 0
+        self.fallbacks = 0
+
+    def record(self, attempts, fell_back=False):
+        """Record one draw that took `attempts` requests and maybe ended in a random fallback."""
+        self.draws += 1
+        self.retries += attempts - 1
+        self.retried_draws += attempts > 1
+        self.fallbacks += fell_back
+
+    def to_dict(self):
+        return {"draws": self.draws, "retries": self.retries,
+                "retried_draws": self.retried_draws, "fallbacks": self.fallbacks}
+
+    def __str__(self):
+        return (f"{self.draws} LLM draws, {self.retried_draws} needed a retry ({self.retries} retries), "
+                f"{self.fallbacks} fell back to a random card")
@@ -0,0 +1,165 @@
+import argparse
+import json
+import time
+from functools import lru_cache
+from cards import valid_cards, card_values, ace_code, hit_upcards, llm_hit_upcards
+
+uniform_probs = [1 / len(valid_cards)] * len(valid_cards)
+
+
+def frequencies_to_probs(frequencies, source="frequencies"):
+    """Normalize a card -> count dict (e.g. player_card_frequencies) into a 13-entry probability vector."""
+    total = sum(frequencies.get(card, 0) for card in valid_cards)
+    if total <= 0:
+        raise ValueError(f"{source} has no card draws to build a distribution from")
+    return [frequencies.get(card, 0) / total for card in valid_cards]
+
+
+def add_card(total, soft, code):
+    """Return the (total, soft) hand state after adding one card, converting Aces from 11 to 1 past 21."""
+    total += card_values[code]
+    soft += code == ace_code
+    while total > 21 and soft:
+        total -= 10
+        soft -= 1
+    return total, soft
+
+
+def exact_outcomes(player_probs=None, dealer_probs=None, player_hit_upcards=hit_upcards):
+    """Compute exact outcome probabilities for the player_strategy/dealer_strategy policies.
+
+    Player and dealer cards are drawn independently from their own 13-entry
+    probability vectors (uniform by default). The player's final-value distribution
+    is memoized over (total, soft flag, upcard); the dealer's over (total, soft flag,
+    has Ace), since the dealer also hits a hard 17 that contains an Ace.
+    """
+    player_probs = uniform_probs if player_probs is None else player_probs
+    dealer_probs = uniform_probs if dealer_probs is None else dealer_probs
+    hit_codes = {valid_cards.index(card) for card in player_hit_upcards}
+
+    @lru_cache(maxsize=None)
+    def player_final(total, soft, upcard):
+        """Distribution of the player's final hand value from a given hand state."""
+        if upcard not in hit_codes or total >= 17:
+            return {total: 1.0}
+        dist = {}
+        for code, p in enumerate(player_probs):
+            if not p:
+                continue
+            for value, q in player_final(*add_card(total, soft, code), upcard).items():
+                dist[value] = dist.get(value, 0.0) + p * q
+        return dist
+
+    @lru_cache(maxsize=None)
+    def dealer_final(total, soft, has_ace):
+        """Distribution of the dealer's final hand value from a given hand state."""
+        if not (total < 17 or (total == 17 and has_ace)):
+            return {total: 1.0}
+        dist = {}
+        for code, p in enumerate(dealer_probs):
+            if not p:
+                continue
+            next_total, next_soft = add_card(total, soft, code)
+            for value, q in dealer_final(next_total, next_soft, has_ace or code == ace_code).items():
+                dist[value] = dist.get(value, 0.0) + p * q
+        return dist
+
+    # Distribution of the player's two-card starting state
+    player_start = {}
+    for first, p1 in enumerate(player_probs):
+        for second, p2 in enumerate(player_probs):
+            state = add_card(*add_card(0, 0, first), second)
+            player_start[state] = player_start.get(state, 0.0) + p1 * p2
+
+    win_record = {"Player": 0.0, "Dealer": 0.0, "Tie": 0.0}
+    dealer_bust = 0.0
+    player_values = {}
+    dealer_values = {}
+    for upcard, p1 in enumerate(dealer_probs):
+        if not p1:
+            continue
+        # The player's final value depends on the dealer's hand only through the upcard
+        player_dist = {}
+        for (total, soft), p in player_start.items():
+            for value, q in player_final(total, soft, upcard).items():
+                player_dist[value] = player_dist.get(value, 0.0) + p * q
+        for hole, p2 in enumerate(dealer_probs):
+            if not p2:
+                continue
+            start_total, start_soft = add_card(*add_card(0, 0, upcard), hole)
+            dealer_dist = dealer_final(start_total, start_soft, upcard == ace_code or hole == ace_code)
+            for player_value, pp in player_dist.items():
+                weight = p1 * p2 * pp
+                player_values[player_value] = player_values.get(player_value, 0.0) + weight
+                if player_value > 21:
+                    # The dealer does not play once the player busts
+                    win_record["Dealer"] += weight
+                    dealer_values[start_total] = dealer_values.get(start_total, 0.0) + weight
+                    continue
+                for dealer_value, pd in dealer_dist.items():
+                    joint = weight * pd
+                    dealer_values[dealer_value] = dealer_values.get(dealer_value, 0.0) + joint
+                    if dealer_value > 21:
+                        dealer_bust += joint
+                        win_record["Player"] += joint
+                    elif player_value > dealer_value:
+                        win_record["Player"] += joint
+                    elif dealer_value > player_value:
+                        win_record["Dealer"] += joint
+                    else:
+                        win_record["Tie"] += joint
+
+    return {
+        "player_final_hand_value_distribution": dict(sorted(player_values.items())),
+        "dealer_final_hand_value_distribution": dict(sorted(dealer_values.items())),
+        "win_record": win_record,
+        "metrics": {
+            "player_win_rate": win_record["Player"] * 100,
+            "dealer_bust_rate": dealer_bust * 100,
+            "average_player_hand_value": sum(v * p for v, p in player_values.items()),
+            "average_dealer_hand_value": sum(v * p for v, p in dealer_values.items())
+        }
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Exact blackjack outcome probabilities for a card distribution.")
+    parser.add_argument("results_files", nargs="*",
+                        help="Results JSON files whose card frequencies define the draw distributions. "
+                             "Without files the uniform deck is used.")
+    parser.add_argument("--hit-upcards", default=None,
+                        help="Comma-separated dealer upcards the player hits below 17 against. By default "
+                             "LLM results files (those with an llm_name) use the LLM drivers' policy and "
+                             "everything else uses the random baseline's.")
+    args = parser.parse_args()
+    forced_hit_upcards = None
+    if args.hit_upcards is not None:
+        forced_hit_upcards = [card.strip() for card in args.hit_upcards.split(",") if card.strip()]
+
+    runs = {"Uniform deck": (None, None, hit_upcards)}
+    if args.results_files:
+        runs = {}
+        for file_path in args.results_files:
+            with open(file_path, 'r') as file:
+                data = json.load(file)
+            try:
+                runs[file_path] = (
+                    frequencies_to_probs(data["player_card_frequencies"], f"{file_path} player_card_frequencies"),
+                    frequencies_to_probs(data["dealer_card_frequencies"], f"{file_path} dealer_card_frequencies"),
+                    llm_hit_upcards if "llm_name" in data else hit_upcards,
+                )
+            except ValueError as error:
+                parser.error(str(error))
+
+    for name, (player_probs, dealer_probs, player_hit_upcards) in runs.items():
+        player_hit_upcards = forced_hit_upcards or player_hit_upcards
+        start = time.perf_counter()
+        outcomes = exact_outcomes(player_probs, dealer_probs, player_hit_upcards)
+        elapsed = (time.perf_counter() - start) * 1000
+        metrics = outcomes["metrics"]
+        print(f"{name} (exact, {elapsed:.1f} ms, player hits against {', '.join(player_hit_upcards)})")
+        print(f"  Player Win Rate: {metrics['player_win_rate']:.3f}%")
+        print(f"  Dealer Bust Rate: {metrics['dealer_bust_rate']:.3f}%")
+        print(f"  Average Player Hand Value: {metrics['average_player_hand_value']:.2f}")
+        print(f"  Average Dealer Hand Value: {metrics['average_dealer_hand_value']:.2f}")
+        print(f"  Win Record: {outcomes['win_record']}")
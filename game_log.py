@@ -0,0 +1,84 @@
+import json
+import os
+
+
+def game_log_path(results_path):
+    """Game log kept next to a results file, e.g. 'model_zeroshot_temp_0.5.games.jsonl'."""
+    return os.path.splitext(results_path)[0] + ".games.jsonl"
+
+
+def state_key_from_json(value):
+    """Turn a state key read back from JSON (nested lists) into the tuple key it was written from."""
+    if isinstance(value, list):
+        return tuple(state_key_from_json(item) for item in value)
+    return value
+
+
+def read_game_log(path):
+    """Return (header, game records) from a game log.
+
+    Reading stops at the first line that is not complete JSON: a process killed
+    mid-write leaves at most one torn line at the end of the log.
+    """
+    header, records = None, []
+    with open(path) as file:
+        for line in file:
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                print(f"Ignoring a truncated line in {path} after {len(records)} games")
+                break
+            if "header" in entry:
+                header = entry["header"]
+            else:
+                records.append(entry)
+    return header, records
+
+
+class GameLog:
+    """Append-only JSONL log of finished games, one line per game.
+
+    The first line is a header with the run settings. Every game line is
+    flushed as soon as it is written, so a crash or Ctrl-C loses only the games
+    still in flight; with `sync` each line is also fsynced, which survives a
+    power loss too. With `resume`, the games already in the log are read back
+    into `records` (after checking the header matches `settings`) and new games
+    are appended after them; without it an existing log is kept as '.bak' and a
+    new one is started.
+    """
+
+    def __init__(self, path, settings, resume=False, sync=False):
+        self.path = path
+        self.sync = sync
+        self.records = []
+        if resume and os.path.exists(path):
+            header, self.records = read_game_log(path)
+            if header is not None and header != settings:
+                raise ValueError(f"{path} was written by a run with different settings ({header}); "
+                                 f"cannot resume it with {settings}")
+            # Rewrite the readable part so a torn last line is not left in the middle of the log
+            with open(path + ".tmp", "w") as file:
+                for entry in [{"header": settings}] + self.records:
+                    file.write(json.dumps(entry) + "\n")
+            os.replace(path + ".tmp", path)
+            self.file = open(path, "a")
+            print(f"Resuming from {len(self.records)} games logged in {path}")
+            return
+        if os.path.exists(path):
+            os.replace(path, path + ".bak")
+            print(f"Moved the previous game log to {path}.bak")
+        self.file = open(path, "w")
+        self.write({"header": settings})
+
+    def write(self, entry):
+        self.file.write(json.dumps(entry) + "\n")
+        self.file.flush()
+        if self.sync:
+            os.fsync(self.file.fileno())
+
+    def append(self, record):
+        self.write(record)
+
+    def close(self):
+        if not self.file.closed:
+            self.file.close()
@@ -0,0 +1,153 @@
+import argparse
+import gzip
+import json
+import struct
+import time
+import numpy as np
+from cards import valid_cards
+
+# File layout: magic, header length (uint32), JSON header padded so rows start on a
+# 64-byte boundary, then the fixed-width rows. The row count is the data size over the
+# row size, so a file cut short by a crash still loads up to its last whole row.
+magic = b"BJRECORD"
+header_alignment = 64
+# Rank code of an empty card slot
+no_card = 255
+default_max_cards = 12
+
+
+def record_dtype(max_cards=default_max_cards):
+    """Row type of one game: uint8 rank codes of up to `max_cards` cards per hand (no_card
+    marks empty slots), the final values, the outcome (1 player wins, -1 dealer wins,
+    0 tie) and the number of cards each hand ended with. A hand longer than `max_cards`
+    keeps its true card count but only its first `max_cards` cards."""
+    return np.dtype([
+        ("player_cards", np.uint8, (max_cards,)),
+        ("dealer_cards", np.uint8, (max_cards,)),
+        ("player_value", np.uint8),
+        ("dealer_value", np.uint8),
+        ("outcome", np.int8),
+        ("player_draws", np.uint8),
+        ("dealer_draws", np.uint8),
+    ])
+
+
+def games_to_records(games, max_cards=default_max_cards):
+    """Pack the per-game arrays of vectorized_blackjack.simulate_games(..., hands=True) into rows."""
+    records = np.empty(games["outcome"].size, dtype=record_dtype(max_cards))
+    records["player_cards"] = games["player_cards"][:, :max_cards]
+    records["dealer_cards"] = games["dealer_cards"][:, :max_cards]
+    records["player_value"] = games["player_final_hand_values"]
+    records["dealer_value"] = games["dealer_final_hand_values"]
+    records["outcome"] = games["outcome"]
+    records["player_draws"] = games["player_draws"]
+    records["dealer_draws"] = games["dealer_draws"]
+    return records
+
+
+class GameRecordWriter:
+    """Write game records to a file chunk by chunk; gzip-compressed when `compress` is set.
+
+    Use as a context manager, calling `write` with each chunk of rows.
+    """
+
+    def __init__(self, path, max_cards=default_max_cards, compress=False):
+        self.path = path
+        self.dtype = record_dtype(max_cards)
+        self.file = gzip.open(path, "wb", compresslevel=6) if compress else open(path, "wb")
+        self.rows = 0
+        header = json.dumps({"version": 1, "max_cards": max_cards, "cards": valid_cards}).encode()
+        padding = -(len(magic) + 4 + len(header)) % header_alignment
+        header += b" " * padding
+        self.file.write(magic + struct.pack("<I", len(header)) + header)
+
+    def write(self, records):
+        if records.dtype != self.dtype:
+            raise ValueError(f"Records of type {records.dtype} do not match the file's {self.dtype}")
+        self.file.write(np.ascontiguousarray(records).tobytes())
+        self.rows += len(records)
+
+    def close(self):
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def read_header(prefix):
+    if prefix[:len(magic)] != magic:
+        raise ValueError("Not a game records file")
+    header_length, = struct.unpack("<I", prefix[len(magic):len(magic) + 4])
+    offset = len(magic) + 4 + header_length
+    return json.loads(prefix[len(magic) + 4:offset]), offset
+
+
+def load_game_records(path):
+    """Load a records file as a structured array.
+
+    An uncompressed file is memory-mapped read-only, so loading costs no copy
+    and pages are read only when a column is used; a gzip file is decompressed
+    into memory.
+    """
+    with open(path, "rb") as file:
+        compressed = file.read(2) == b"\x1f\x8b"
+    if compressed:
+        with gzip.open(path, "rb") as file:
+            data = file.read()
+        header, offset = read_header(data)
+        dtype = record_dtype(header["max_cards"])
+        rows = (len(data) - offset) // dtype.itemsize
+        return np.frombuffer(data, dtype=dtype, count=rows, offset=offset)
+    with open(path, "rb") as file:
+        prefix = file.read(len(magic) + 4)
+        header_length, = struct.unpack("<I", prefix[len(magic):])
+        header, offset = read_header(prefix + file.read(header_length))
+        file.seek(0, 2)
+        size = file.tell()
+    dtype = record_dtype(header["max_cards"])
+    rows = (size - offset) // dtype.itemsize
+    if rows == 0:
+        return np.empty(0, dtype=dtype)
+    return np.memmap(path, dtype=dtype, mode="r", offset=offset, shape=(rows,))
+
+
+def summarize_records(records):
+    """Win record, dealer bust rate, average final values and card counts of a records array."""
+    outcome = records["outcome"]
+    num_games = len(records)
+    games = num_games or 1
+    player_cards = np.bincount(records["player_cards"].ravel(), minlength=no_card + 1)[:len(valid_cards)]
+    dealer_cards = np.bincount(records["dealer_cards"].ravel(), minlength=no_card + 1)[:len(valid_cards)]
+    win_record = {"Player": int(np.count_nonzero(outcome == 1)), "Dealer": int(np.count_nonzero(outcome == -1)),
+                  "Tie": int(np.count_nonzero(outcome == 0))}
+    dealer_busts = int(np.count_nonzero((records["dealer_value"] > 21) & (records["player_value"] <= 21)))
+    return {
+        "num_games": num_games,
+        "player_card_frequencies": {card: int(count) for card, count in zip(valid_cards, player_cards) if count},
+        "dealer_card_frequencies": {card: int(count) for card, count in zip(valid_cards, dealer_cards) if count},
+        "win_record": win_record,
+        "metrics": {
+            "player_win_rate": win_record["Player"] / games * 100,
+            "dealer_bust_rate": dealer_busts / games * 100,
+            "average_player_hand_value": float(records["player_value"].mean()) if num_games else 0.0,
+            "average_dealer_hand_value": float(records["dealer_value"].mean()) if num_games else 0.0,
+        },
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load a game records file and summarize it.")
+    parser.add_argument("path", help="Records file written by vectorized_blackjack.py --records.")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    records = load_game_records(args.path)
+    loaded = time.perf_counter()
+    summary = summarize_records(records)
+    summarized = time.perf_counter()
+    print(f"Loaded {len(records):,} games in {(loaded - start) * 1000:.1f} ms, "
+          f"summarized in {(summarized - loaded) * 1000:.1f} ms")
+    print(json.dumps(summary, indent=2))
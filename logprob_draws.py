@@ -0,0 +1,90 @@
+import asyncio
+import math
+import random
+from card_parser import card_aliases
+
+# Lowercase spellings a first token can start, mapped to their card (the parser's
+# whole-word spellings, so a token maps to the card the full answer would parse as)
+card_spellings = card_aliases
+
+
+def token_to_card(token):
+    """Map a first token to the card it begins (e.g. ' K' or 'Qu'), or None if it is ambiguous or no card."""
+    prefix = token.strip().lower()
+    if not prefix:
+        return None
+    cards = {card for spelling, card in card_spellings.items() if spelling.startswith(prefix)}
+    return cards.pop() if len(cards) == 1 else None
+
+
+def card_distribution(top_logprobs, temperature=1.0):
+    """Renormalize (token, logprob) pairs over the 13 cards, rescaled to `temperature`.
+
+    Returns a card -> probability dict, or None when no top token starts a card.
+    At temperature 0 all the mass goes to the most likely card.
+    """
+    logprobs = {}
+    for token, logprob in top_logprobs:
+        card = token_to_card(token)
+        if card is not None:
+            # Several tokens can start the same card (' King', 'K'); combine their mass
+            logprobs[card] = logprob if card not in logprobs else math.log(math.exp(logprobs[card]) + math.exp(logprob))
+    if not logprobs:
+        return None
+    temperature = float(temperature)
+    if temperature == 0:
+        return {max(logprobs, key=logprobs.get): 1.0}
+    top = max(logprobs.values())
+    weights = {card: math.exp((logprob - top) / temperature) for card, logprob in logprobs.items()}
+    total = sum(weights.values())
+    return {card: weight / total for card, weight in weights.items()}
+
+
+class LogprobDealer:
+    """Draw cards by sampling the model's first-token distribution, requested once per distinct state.
+
+    `fetch_top_logprobs(game_state)` makes one request and returns the top
+    (token, logprob) pairs of its first token. The renormalized distribution is
+    memoized under `state_key(game_state)`, so repeated states cost nothing and
+    concurrent draws for the same state share one request. States whose top
+    tokens contain no card are drawn with `fallback_draw(game_state)`.
+    """
+
+    def __init__(self, fetch_top_logprobs, fallback_draw, temperature=1.0, state_key=repr):
+        self.fetch_top_logprobs = fetch_top_logprobs
+        self.fallback_draw = fallback_draw
+        self.temperature = temperature
+        self.state_key = state_key
+        self.distributions = {}
+        self.requests = 0
+        self.reused = 0
+
+    async def distribution(self, game_state):
+        key = self.state_key(game_state)
+        pending = self.distributions.get(key)
+        if pending is None:
+            self.requests += 1
+            pending = self.distributions[key] = asyncio.ensure_future(self.fetch_distribution(game_state))
+        else:
+            self.reused += 1
+        try:
+            return await asyncio.shield(pending)
+        except Exception:
+            # Let a later draw of this state retry the request
+            if self.distributions.get(key) is pending:
+                del self.distributions[key]
+            raise
+
+    async def fetch_distribution(self, game_state):
+        return card_distribution(await self.fetch_top_logprobs(game_state), self.temperature)
+
+    async def draw(self, game_state):
+        distribution = await self.distribution(game_state)
+        if distribution is None:
+            return await self.fallback_draw(game_state)
+        return random.choices(list(distribution), weights=list(distribution.values()))[0]
+
+    def snapshot(self):
+        """The memoized distributions by state key, for the results file."""
+        return {str(key): pending.result() for key, pending in self.distributions.items()
+                if pending.done() and not pending.exception() and pending.result() is not None}
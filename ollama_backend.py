@@ -0,0 +1,78 @@
+import asyncio
+import ollama
+from card_parser import card_pattern
+
+
+class OllamaBackend:
+    """Ollama client for card draws that keeps one HTTP session and the model loaded.
+
+    - One `ollama.AsyncClient` (one pooled httpx session) serves every call.
+    - The model is loaded with an empty generate call before the first draw and
+      every request passes `keep_alive`, so it stays resident between draws and runs.
+    - `temperature` and a `num_predict` cap are sent as request options.
+    - Free-text answers are streamed and the stream is closed as soon as the text
+      names a card, so a chatty answer costs a few tokens instead of a full reply.
+    """
+
+    def __init__(self, model, temperature=None, keep_alive="30m", num_predict=16, host=None, stream=True):
+        self.client = ollama.AsyncClient(host=host)
+        self.model = model
+        self.temperature = temperature
+        self.keep_alive = keep_alive
+        self.num_predict = num_predict
+        self.stream = stream
+        self.loaded = False
+        self.load_lock = None
+
+    def options(self, **overrides):
+        options = {"num_predict": self.num_predict}
+        if self.temperature is not None:
+            options["temperature"] = float(self.temperature)
+        options.update(overrides)
+        return options
+
+    async def preload(self):
+        """Load the model into memory once; concurrent callers wait for the same load."""
+        if self.loaded:
+            return
+        if self.load_lock is None:
+            self.load_lock = asyncio.Lock()
+        async with self.load_lock:
+            if not self.loaded:
+                # A generate call without a prompt only loads the model
+                await self.client.generate(model=self.model, keep_alive=self.keep_alive)
+                self.loaded = True
+
+    async def unload(self):
+        """Free the model's memory now instead of when keep_alive expires."""
+        await self.client.generate(model=self.model, keep_alive=0)
+        self.loaded = False
+
+    async def chat(self, messages, format=None):
+        """Return the response text for one draw prompt, stopping early once it names a card."""
+        await self.preload()
+        if not self.stream or format:
+            # A structured answer is only a few tokens and must be read whole
+            res = await self.client.chat(model=self.model, messages=messages, format=format,
+                                         options=self.options(), keep_alive=self.keep_alive)
+            return res['message']['content']
+        text = ""
+        stream = await self.client.chat(model=self.model, messages=messages, stream=True,
+                                        options=self.options(), keep_alive=self.keep_alive)
+        try:
+            async for part in stream:
+                text += part['message']['content']
+                match = card_pattern.search(text)
+                # Wait for one character past the card name so "10" is not cut from "100"
+                if match and match.end() < len(text):
+                    break
+        finally:
+            await stream.aclose()
+        return text
+
+    async def top_logprobs(self, messages, count=20):
+        """Top (token, logprob) pairs of the first response token."""
+        await self.preload()
+        res = await self.client.chat(model=self.model, messages=messages, logprobs=True, top_logprobs=count,
+                                     options=self.options(num_predict=1), keep_alive=self.keep_alive)
+        return [(entry.token, entry.logprob) for entry in res.logprobs[0].top_logprobs]
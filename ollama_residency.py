@@ -0,0 +1,104 @@
+import asyncio
+import ollama
+from ollama_backend import OllamaBackend
+
+
+def model_tag(name):
+    """Ollama's full name for a model; a name without a tag means ':latest'."""
+    return name if ":" in name else f"{name}:latest"
+
+
+class OllamaResidency:
+    """Run local-model work grouped by model, keeping the resident models within a budget.
+
+    Switching models makes Ollama unload one and load the next, which costs
+    seconds to minutes on CPU. `run` therefore plays each model's runs as one
+    group, one group at a time, and loads the next group's model in the
+    background while the current group finishes, when the budget has room for
+    both. At most `max_resident` models, and if `memory_gb` is set at most that
+    much model weight (estimated from the model file sizes), stay loaded at
+    once. Models are unloaded only when a new one needs their room, oldest first.
+    """
+
+    def __init__(self, max_resident=1, memory_gb=None, host=None):
+        self.max_resident = max(1, max_resident)
+        self.memory_bytes = memory_gb * 1e9 if memory_gb else None
+        self.host = host
+        self.client = ollama.AsyncClient(host=host)
+        self.sizes = {}
+        self.resident = []
+        self.loads = {}
+        self.load_count = 0
+
+    async def refresh(self):
+        """Read the model sizes and which models the server already has loaded."""
+        try:
+            listed = await self.client.list()
+            self.sizes = {model_tag(model.model): model.size or 0 for model in listed.models}
+            running = await self.client.ps()
+            self.resident = [model_tag(model.model) for model in running.models]
+        except Exception as error:
+            print(f"Could not read the Ollama model list ({error}); budgeting by model count only")
+
+    def fits(self, models):
+        if len(models) > self.max_resident:
+            return False
+        if self.memory_bytes is None:
+            return True
+        return sum(self.sizes.get(model, 0) for model in models) <= self.memory_bytes
+
+    async def make_room(self, model, keep):
+        """Unload the oldest resident models, other than those in `keep`, until `model` fits."""
+        while not self.fits(self.resident + [model]):
+            evictable = [resident for resident in self.resident if resident not in keep]
+            if not evictable:
+                return False
+            victim = evictable[0]
+            self.resident.remove(victim)
+            self.loads.pop(victim, None)
+            await OllamaBackend(victim, host=self.host).unload()
+            print(f"Unloaded {victim}")
+        return True
+
+    def load(self, model):
+        """Start (or join) loading `model`; returns the loading task."""
+        if model not in self.loads:
+            self.loads[model] = asyncio.ensure_future(self.load_model(model))
+        return self.loads[model]
+
+    async def load_model(self, model):
+        if model in self.resident:
+            return
+        # Counted against the budget from the start of the load
+        self.resident.append(model)
+        self.load_count += 1
+        try:
+            await OllamaBackend(model, host=self.host).preload()
+            print(f"Loaded {model}")
+        except Exception as error:
+            # The group's runs will report the error themselves
+            print(f"Could not preload {model}: {error}")
+
+    async def run(self, groups):
+        """Run `groups`, a list of (model, [async functions]), one model group after another."""
+        await self.refresh()
+        tags = [model_tag(model) for model, _ in groups]
+        for index, (_, runs) in enumerate(groups):
+            model = tags[index]
+            await self.make_room(model, keep={model})
+            await self.load(model)
+            next_model = tags[index + 1] if index + 1 < len(groups) else None
+            if next_model and next_model != model and self.fits([model, next_model]):
+                # Room for both: load the next model while this group plays
+                if await self.make_room(next_model, keep={model, next_model}):
+                    self.load(next_model)
+            await asyncio.gather(*(run() for run in runs))
+        print(f"Ollama: {len(groups)} model groups, {self.load_count} model loads")
+
+
+def group_by_model(items, model_of):
+    """Group `items` by model, keeping models in order of first appearance."""
+    groups = {}
+    for item in items:
+        groups.setdefault(model_of(item), []).append(item)
+    return list(groups.items())
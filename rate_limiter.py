@@ -0,0 +1,163 @@
+import asyncio
+import inspect
+import time
+
+# Rate-limit response headers, Anthropic names first, then OpenAI names
+limit_headers = {
+    "requests": ("anthropic-ratelimit-requests-limit", "x-ratelimit-limit-requests"),
+    "tokens": ("anthropic-ratelimit-tokens-limit", "x-ratelimit-limit-tokens"),
+}
+remaining_headers = {
+    "requests": ("anthropic-ratelimit-requests-remaining", "x-ratelimit-remaining-requests"),
+    "tokens": ("anthropic-ratelimit-tokens-remaining", "x-ratelimit-remaining-tokens"),
+}
+
+
+class TokenBucket:
+    """A bucket holding up to `per_minute` units that refills continuously at per_minute / 60 per second."""
+
+    def __init__(self, per_minute):
+        self.capacity = float(per_minute)
+        self.level = float(per_minute)
+        self.updated = time.monotonic()
+
+    def refill(self, now):
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.capacity / 60)
+        self.updated = now
+
+    def wait_time(self, amount):
+        """Seconds until `amount` units are available (0 if they already are)."""
+        deficit = min(amount, self.capacity) - self.level
+        return max(0.0, deficit * 60 / self.capacity)
+
+
+class RateLimiter:
+    """Token-bucket limiter shared by every concurrent request to one provider.
+
+    It starts from the configured requests/tokens per minute and re-seeds itself
+    from the limit/remaining headers of each response, so a run goes as fast as
+    the account's real quota allows. Requests are only paused on a 429, for the
+    server's retry-after or an exponential backoff.
+    """
+
+    def __init__(self, requests_per_minute, tokens_per_minute=None, max_backoff=60.0):
+        self.buckets = {"requests": TokenBucket(requests_per_minute)}
+        if tokens_per_minute:
+            self.buckets["tokens"] = TokenBucket(tokens_per_minute)
+        self.max_backoff = max_backoff
+        self.paused_until = 0.0
+        self.consecutive_rate_limits = 0
+        self.lock = asyncio.Lock()
+        self.changed = asyncio.Event()
+
+    async def acquire(self, tokens=0):
+        """Wait until one request and `tokens` tokens are available, then take them."""
+        amounts = {"requests": 1, "tokens": tokens}
+        # The lock makes waiters queue in arrival order instead of racing for refills
+        async with self.lock:
+            while True:
+                now = time.monotonic()
+                wait = self.paused_until - now
+                if wait <= 0:
+                    for bucket in self.buckets.values():
+                        bucket.refill(now)
+                    wait = max(bucket.wait_time(amounts[name]) for name, bucket in self.buckets.items())
+                    if wait <= 0:
+                        for name, bucket in self.buckets.items():
+                            bucket.level -= amounts[name]
+                        return
+                # Wake early if a response's headers raise the limits in the meantime
+                self.changed.clear()
+                try:
+                    await asyncio.wait_for(self.changed.wait(), wait)
+                except asyncio.TimeoutError:
+                    pass
+
+    def update_from_headers(self, headers):
+        """Adjust bucket sizes and levels from a response's rate-limit headers."""
+        self.consecutive_rate_limits = 0
+        now = time.monotonic()
+        for name, bucket in self.buckets.items():
+            limit = first_header(headers, limit_headers[name])
+            remaining = first_header(headers, remaining_headers[name])
+            if limit:
+                bucket.refill(now)
+                bucket.capacity = limit
+            if remaining is not None:
+                # "remaining" does not count requests still in flight, which the local
+                # bucket has already taken, so headers may only lower the level
+                bucket.refill(now)
+                bucket.level = min(bucket.level, remaining)
+        self.changed.set()
+
+    def backoff(self, headers=None):
+        """Pause all requests after a 429, honouring retry-after when the server sends it."""
+        self.consecutive_rate_limits += 1
+        delay = None
+        if headers is not None:
+            delay = first_header(headers, ("retry-after",))
+            retry_after_ms = first_header(headers, ("retry-after-ms",))
+            if retry_after_ms is not None:
+                delay = retry_after_ms / 1000
+        if delay is None:
+            delay = min(self.max_backoff, 2 ** self.consecutive_rate_limits)
+        now = time.monotonic()
+        self.paused_until = max(self.paused_until, now + delay)
+        for bucket in self.buckets.values():
+            bucket.level = 0.0
+            bucket.updated = now
+
+
+def first_header(headers, names):
+    """Return the first of `names` present in `headers` as a float, or None."""
+    for name in names:
+        value = headers.get(name)
+        if value is not None:
+            try:
+                return float(value)
+            except ValueError:
+                continue
+    return None
+
+
+def estimate_tokens(messages, max_tokens):
+    """Rough token cost of a request: about four characters per prompt token plus the completion cap."""
+    return sum(len(str(message['content'])) for message in messages) // 4 + max_tokens
+
+
+def is_quota_exhausted(error):
+    """True for a 429 that reports an exhausted account (OpenAI `insufficient_quota`), which retrying cannot fix."""
+    if getattr(error, "code", None) == "insufficient_quota":
+        return True
+    body = getattr(error, "body", None)
+    if isinstance(body, dict):
+        details = body.get("error", body)
+        return isinstance(details, dict) and details.get("code") == "insufficient_quota"
+    return False
+
+
+async def call_with_rate_limit(rate_limiter, create, rate_limit_error, tokens=0, max_attempts=8, **request):
+    """Call a `with_raw_response.create` method under `rate_limiter` and return the parsed response.
+
+    Rate-limit headers of every response feed back into the limiter; a
+    `rate_limit_error` (HTTP 429) pauses the limiter and the request is retried,
+    up to `max_attempts` times before the error is re-raised. An exhausted
+    quota is re-raised immediately. Clients should be built with
+    `max_retries=0` so that every 429 reaches the limiter.
+    """
+    for attempt in range(max_attempts):
+        await rate_limiter.acquire(tokens)
+        try:
+            raw = await create(**request)
+        except rate_limit_error as error:
+            if is_quota_exhausted(error) or attempt == max_attempts - 1:
+                raise
+            rate_limiter.backoff(error.response.headers)
+            print(f"Rate limited (attempt {attempt + 1} of {max_attempts}); backing off")
+            continue
+        rate_limiter.update_from_headers(raw.headers)
+        # parse() is a coroutine on newer async SDK responses and a plain method on older ones
+        parsed = raw.parse()
+        if inspect.isawaitable(parsed):
+            parsed = await parsed
+        return parsed
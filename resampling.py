@@ -0,0 +1,197 @@
+"""Bootstrap confidence intervals and permutation p-values for run metrics and divergences.
+
+Every statistic a results file reports is a function of a few histograms:
+the win record (Player/Dealer/Tie), the dealer bust count, the final hand
+value histograms and the card rank counts. A bootstrap replicate of a run is a
+multinomial redraw of each histogram at its own total, so all replicates come
+from one `Generator.multinomial` call per histogram, as a replicates x bins
+matrix. A permutation replicate of a pair of runs splits their pooled
+histogram at the first run's total, which is one
+`Generator.multivariate_hypergeometric` call. The statistics are then
+computed down the replicate axis at once.
+"""
+import argparse
+import itertools
+import json
+import multiprocessing
+import os
+import numpy as np
+from distributions import card_counts, final_value_counts, normalize, value_index, divergences
+from results_catalog import ResultsCatalog
+
+
+def run_histograms(summary):
+    """The integer histograms behind a results dict or catalog summary."""
+    busts = summary.get("dealer_bust_count")
+    games = sum(summary["win_record"].values())
+    if busts is None:
+        busts = round(summary["metrics"]["dealer_bust_rate"] * games / 100)
+    histograms = {
+        "win_record": np.array([summary["win_record"][outcome] for outcome in ("Player", "Dealer", "Tie")]),
+        "dealer_busts": np.array([busts, games - busts]),
+    }
+    for side in ("player", "dealer"):
+        histograms[f"{side}_values"] = final_value_counts(summary, side)
+        histograms[f"{side}_cards"] = card_counts(summary[f"{side}_card_frequencies"])
+    return {name: np.asarray(counts, dtype=np.int64) for name, counts in histograms.items()}
+
+
+def share(counts):
+    return 100 * counts[..., 0] / np.maximum(counts.sum(axis=-1), 1)
+
+
+def mean_value(counts):
+    return counts @ value_index / np.maximum(counts.sum(axis=-1), 1)
+
+
+# Results metric -> (histogram it is computed from, statistic over the last axis)
+metric_statistics = {
+    "player_win_rate": ("win_record", share),
+    "dealer_bust_rate": ("dealer_busts", share),
+    "average_player_hand_value": ("player_values", mean_value),
+    "average_dealer_hand_value": ("dealer_values", mean_value),
+}
+# The distributions distribution_shifts.py compares, by histogram name
+distribution_names = ("player_cards", "dealer_cards", "player_values", "dealer_values")
+
+
+def bootstrap(counts, replicates, rng):
+    """`replicates` multinomial redraws of a histogram at its own total, as a replicates x bins matrix."""
+    total = counts.sum()
+    if not total:
+        return np.zeros((replicates, counts.size), dtype=np.int64)
+    return rng.multinomial(total, counts / total, size=replicates)
+
+
+def permute(counts_a, counts_b, replicates, rng):
+    """`replicates` random relabelings of the pooled draws of two histograms, keeping each run's total."""
+    pooled = counts_a + counts_b
+    first = rng.multivariate_hypergeometric(pooled, counts_a.sum(), size=replicates, method="marginals")
+    return first, pooled - first
+
+
+def interval(samples, confidence):
+    """Percentile interval of the replicates."""
+    tail = (1 - confidence) / 2 * 100
+    low, high = np.percentile(samples, [tail, 100 - tail])
+    return [float(low), float(high)]
+
+
+def p_value(observed, replicates):
+    """Share of replicates at least as extreme as `observed`, counting the observed arrangement itself."""
+    return float((1 + np.count_nonzero(replicates >= observed - 1e-12)) / (1 + replicates.size))
+
+
+def run_intervals(summary, replicates=10_000, confidence=0.95, seed=None):
+    """Bootstrap confidence interval of every results metric of one run."""
+    rng = np.random.default_rng(seed)
+    histograms = run_histograms(summary)
+    intervals = {}
+    for metric, (name, statistic) in metric_statistics.items():
+        intervals[metric] = {"value": float(statistic(histograms[name])),
+                             "interval": interval(statistic(bootstrap(histograms[name], replicates, rng)), confidence)}
+    return intervals
+
+
+def compare_runs(summary_a, summary_b, replicates=10_000, confidence=0.95, pseudo_count=0.5, seed=None):
+    """Compare two runs: every results metric and every divergence, each with an interval and a p-value.
+
+    Metrics get the bootstrap interval of the difference (run a minus run b)
+    and a two-sided permutation p-value for it. Divergences get the bootstrap
+    interval of the divergence and the permutation p-value of "both runs draw
+    from the same distribution". Bootstrapped divergences are biased upwards
+    by sampling noise; the permutation p-value is the test to read.
+    """
+    rng = np.random.default_rng(seed)
+    a, b = run_histograms(summary_a), run_histograms(summary_b)
+    boot_a = {name: bootstrap(counts, replicates, rng) for name, counts in a.items()}
+    boot_b = {name: bootstrap(counts, replicates, rng) for name, counts in b.items()}
+    permuted = {name: permute(a[name], b[name], replicates, rng) for name in a}
+    comparison = {}
+    for metric, (name, statistic) in metric_statistics.items():
+        observed = statistic(a[name]) - statistic(b[name])
+        null = statistic(permuted[name][0]) - statistic(permuted[name][1])
+        comparison[metric] = {
+            "a": float(statistic(a[name])), "b": float(statistic(b[name])), "difference": float(observed),
+            "interval": interval(statistic(boot_a[name]) - statistic(boot_b[name]), confidence),
+            "p_value": p_value(abs(observed), np.abs(null)),
+        }
+    for name in distribution_names:
+        for divergence_name, divergence in divergences.items():
+            def between(counts_a, counts_b):
+                return divergence(normalize(counts_a, pseudo_count), normalize(counts_b, pseudo_count))
+            observed = between(a[name], b[name])
+            comparison[f"{name}_{divergence_name}"] = {
+                "value": float(observed),
+                "interval": interval(between(boot_a[name], boot_b[name]), confidence),
+                "p_value": p_value(observed, between(*permuted[name])),
+            }
+    return comparison
+
+
+def compare_pair(job):
+    """Process-pool worker: (summary a, summary b, replicates, confidence, pseudo-count, seed) -> comparison."""
+    return compare_runs(*job)
+
+
+def compare_grid(summaries, replicates=10_000, confidence=0.95, pseudo_count=0.5, seed=None, workers=None):
+    """compare_runs for every pair of `summaries`; returns {(i, j): comparison} for i < j.
+
+    Each pair gets its own child of one SeedSequence, so a seed reproduces the
+    grid; with more than one pair and `workers` other than 1 the pairs are
+    spread over a process pool.
+    """
+    pairs = list(itertools.combinations(range(len(summaries)), 2))
+    seeds = np.random.SeedSequence(seed).spawn(len(pairs))
+    jobs = [(summaries[i], summaries[j], replicates, confidence, pseudo_count, pair_seed)
+            for (i, j), pair_seed in zip(pairs, seeds)]
+    if len(jobs) > 1 and workers != 1:
+        with multiprocessing.Pool(min(workers or os.cpu_count(), len(jobs))) as pool:
+            comparisons = pool.map(compare_pair, jobs)
+    else:
+        comparisons = [compare_pair(job) for job in jobs]
+    return dict(zip(pairs, comparisons))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Confidence intervals and p-values for runs and their differences.")
+    parser.add_argument("paths", nargs="+", help="Results files; two or more are compared pair by pair.")
+    parser.add_argument("--replicates", type=int, default=10_000, help="Bootstrap and permutation replicates.")
+    parser.add_argument("--confidence", type=float, default=0.95)
+    parser.add_argument("--pseudo-count", type=float, default=0.5, help="Smoothing of the compared distributions.")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--workers", type=int, default=None, help="Processes for the pairs (default: every core).")
+    parser.add_argument("--output", help="Also write every interval and p-value to this JSON file.")
+    args = parser.parse_args()
+    if args.replicates <= 0:
+        parser.error("--replicates must be positive")
+    if not 0 < args.confidence < 1:
+        parser.error("--confidence must be between 0 and 1")
+
+    catalog = ResultsCatalog()
+    rows = catalog.ingest(args.paths, args.workers)
+    summaries = [json.loads(row["summary"]) for row in rows]
+    labels = [os.path.splitext(os.path.basename(path))[0] for path in args.paths]
+    percent = f"{args.confidence:.0%}"
+
+    report = {"runs": {}, "comparisons": []}
+    for label, summary in zip(labels, summaries):
+        intervals = run_intervals(summary, args.replicates, args.confidence, args.seed)
+        report["runs"][label] = intervals
+        print(f"{label} ({sum(summary['win_record'].values())} games)")
+        for metric, result in intervals.items():
+            low, high = result["interval"]
+            print(f"  {metric}: {result['value']:.3f} ({percent} CI {low:.3f} to {high:.3f})")
+
+    grid = compare_grid(summaries, args.replicates, args.confidence, args.pseudo_count, args.seed, args.workers)
+    for (i, j), comparison in grid.items():
+        report["comparisons"].append({"a": labels[i], "b": labels[j], "results": comparison})
+        print(f"\n{labels[i]} vs {labels[j]}")
+        for name, result in comparison.items():
+            low, high = result["interval"]
+            value = result.get("difference", result.get("value"))
+            print(f"  {name}: {value:.4f} ({percent} CI {low:.4f} to {high:.4f}), p = {result['p_value']:.4f}")
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(report, file, indent=2)
+        print(f"\nIntervals and p-values written to {args.output}")
@@ -0,0 +1,171 @@
+import argparse
+import json
+import multiprocessing
+import os
+import re
+import sqlite3
+from aggregators import GameAggregate
+
+default_catalog_path = "results_catalog.sqlite"
+
+
+def describe_results(path, results):
+    """Run metadata for the catalog: from the results fields, else from the file name."""
+    name = os.path.basename(path)
+    llm_name = results.get("llm_name")
+    provider = results.get("provider")
+    if llm_name is None:
+        # The random baseline scripts write no run settings
+        llm_name, provider = "random", provider or "random"
+    temperature = results.get("temperature")
+    if temperature is None:
+        match = re.search(r"temp_?([0-9.]+?)(?:_|\.json)", name)
+        temperature = float(match.group(1)) if match else None
+    shot_type = results.get("shot_type")
+    if shot_type is None:
+        match = re.search(r"(few|zero)", name)
+        shot_type = match.group(1) if match else None
+    dealer = results.get("dealer")
+    deceptive = dealer == "deceptive" if dealer else "_deceptive" in name
+    return {"provider": provider, "model": llm_name, "temperature": temperature, "shot_type": shot_type,
+            "deceptive": deceptive}
+
+
+def summarize_file(path):
+    """Parse one results file into (run metadata, game count, summary); the worker of ResultsCatalog.ingest."""
+    with open(path) as file:
+        results = json.load(file)
+    aggregate = GameAggregate.from_results(results)
+    return describe_results(path, results), aggregate.num_games, aggregate.to_results()
+
+
+class ResultsCatalog:
+    """SQLite index of results files, with each run's settings and summary.
+
+    Every run is one row: path, provider, model, temperature, shot type,
+    deceptive flag, game count, headline rates and the run's summary (card
+    frequencies, final hand value histograms, win record and metrics, a few KB
+    as JSON), so analyses over many runs never load the per-game lists. A file
+    is parsed again only when its size or modification time has changed.
+    """
+
+    def __init__(self, path=default_catalog_path):
+        self.connection = sqlite3.connect(path)
+        self.connection.row_factory = sqlite3.Row
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS runs ("
+            "path TEXT PRIMARY KEY, provider TEXT, model TEXT, temperature REAL, shot_type TEXT, "
+            "deceptive INTEGER NOT NULL, num_games INTEGER NOT NULL, player_win_rate REAL, dealer_bust_rate REAL, "
+            "modified REAL NOT NULL, size INTEGER NOT NULL, summary TEXT NOT NULL)")
+        self.connection.execute("CREATE INDEX IF NOT EXISTS runs_settings ON runs (model, temperature, shot_type, deceptive)")
+        self.connection.commit()
+
+    def row(self, path):
+        return self.connection.execute("SELECT * FROM runs WHERE path = ?", (os.path.abspath(path),)).fetchone()
+
+    def is_current(self, path):
+        """Whether `path` is cataloged and unchanged since."""
+        row = self.row(path)
+        stat = os.stat(path)
+        return row is not None and row["modified"] == stat.st_mtime and row["size"] == stat.st_size
+
+    def store(self, path, run, num_games, summary):
+        path = os.path.abspath(path)
+        stat = os.stat(path)
+        self.connection.execute(
+            "INSERT OR REPLACE INTO runs VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (path, run["provider"], run["model"], run["temperature"], run["shot_type"], int(run["deceptive"]),
+             num_games, summary["metrics"]["player_win_rate"], summary["metrics"]["dealer_bust_rate"],
+             stat.st_mtime, stat.st_size, json.dumps(summary)))
+        self.connection.commit()
+        return self.row(path)
+
+    def register(self, path, results=None, **metadata):
+        """Catalog the results file at `path`; `results` saves re-reading a file just written.
+
+        `metadata` (provider, model, temperature, shot_type, deceptive) overrides
+        what describe_results reads from the file. Returns the run's row.
+        """
+        if results is None and not metadata and self.is_current(path):
+            return self.row(path)
+        if results is None:
+            run, num_games, summary = summarize_file(path)
+        else:
+            aggregate = GameAggregate.from_results(results)
+            run, num_games, summary = describe_results(path, results), aggregate.num_games, aggregate.to_results()
+        return self.store(path, dict(run, **metadata), num_games, summary)
+
+    def scan(self, paths):
+        """Catalog every results file in `paths`, skipping unchanged ones; returns their rows."""
+        return [self.register(path) for path in paths]
+
+    def ingest(self, paths, workers=None):
+        """Like scan, but the new or changed files are parsed in a pool of `workers` processes."""
+        stale = [path for path in dict.fromkeys(paths) if not self.is_current(path)]
+        if len(stale) > 1 and workers != 1:
+            with multiprocessing.Pool(min(workers or os.cpu_count(), len(stale))) as pool:
+                for path, (run, num_games, summary) in zip(stale, pool.imap(summarize_file, stale)):
+                    self.store(path, run, num_games, summary)
+        else:
+            self.scan(stale)
+        return [self.row(path) for path in paths]
+
+    def runs(self, **filters):
+        """Rows of the cataloged runs matching `filters` (column=value), ordered by model and settings."""
+        where = " AND ".join(f"{column} = ?" for column in filters)
+        query = "SELECT * FROM runs" + (f" WHERE {where}" if where else "")
+        query += " ORDER BY model, temperature, shot_type, deceptive, path"
+        return self.connection.execute(query, [int(value) if isinstance(value, bool) else value
+                                               for value in filters.values()]).fetchall()
+
+    def summary(self, path):
+        """The stored summary of the run at `path`, cataloging the file first if needed."""
+        return json.loads(self.register(path)["summary"])
+
+    def remove_missing(self):
+        """Drop the runs whose results file no longer exists; returns how many were dropped."""
+        missing = [row["path"] for row in self.connection.execute("SELECT path FROM runs")
+                   if not os.path.exists(row["path"])]
+        self.connection.executemany("DELETE FROM runs WHERE path = ?", [(path,) for path in missing])
+        self.connection.commit()
+        return len(missing)
+
+    def close(self):
+        self.connection.close()
+
+
+def catalog_results(path, results, catalog_path=default_catalog_path, **metadata):
+    """Add a results file that was just written to the catalog."""
+    catalog = ResultsCatalog(catalog_path)
+    try:
+        catalog.register(path, results, **metadata)
+    finally:
+        catalog.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Index results files and list the cataloged runs.")
+    parser.add_argument("--catalog", default=default_catalog_path, help="Catalog database file.")
+    parser.add_argument("--scan", nargs="+", default=[], metavar="FILE", help="Results files to catalog.")
+    parser.add_argument("--workers", type=int, default=None, help="Processes parsing new files (default: every core).")
+    parser.add_argument("--model", help="Only list runs of this model.")
+    parser.add_argument("--provider", help="Only list runs of this provider.")
+    parser.add_argument("--temperature", type=float)
+    parser.add_argument("--shot-type", choices=("zero", "few"))
+    parser.add_argument("--deceptive", choices=("yes", "no"))
+    parser.add_argument("--prune", action="store_true", help="Drop runs whose results file is gone.")
+    args = parser.parse_args()
+
+    catalog = ResultsCatalog(args.catalog)
+    catalog.ingest(args.scan, args.workers)
+    if args.prune:
+        print(f"Dropped {catalog.remove_missing()} runs with missing files")
+    filters = {column: value for column, value in (("model", args.model), ("provider", args.provider),
+                                                  ("temperature", args.temperature), ("shot_type", args.shot_type))
+               if value is not None}
+    if args.deceptive:
+        filters["deceptive"] = args.deceptive == "yes"
+    for row in catalog.runs(**filters):
+        print(f"{row['model']:<32} {row['provider'] or '-':<9} t={row['temperature']} {row['shot_type'] or '-':<4} "
+              f"{'deceptive' if row['deceptive'] else 'honest':<9} {row['num_games']:>9} games  "
+              f"win {row['player_win_rate']:.2f}%  bust {row['dealer_bust_rate']:.2f}%  {row['path']}")
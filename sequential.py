@@ -0,0 +1,128 @@
+import math
+from cards import valid_cards, card_codes
+
+
+def normal_mixture_radius(count, alpha, tuned_count=1000, sigma=0.5):
+    """Half-width of a two-sided always-valid 1 - alpha confidence sequence for a mean after `count` observations.
+
+    The normal-mixture boundary of Howard et al. (2021) for sigma-sub-Gaussian
+    observations (any 0/1 indicator is 1/2-sub-Gaussian), with the mixture
+    tuned to be tightest around `tuned_count`. It holds at every count at
+    once, so a run may stop the first time it is narrow enough.
+    """
+    if count <= 0:
+        return math.inf
+    log_term = -2 * math.log(alpha / 2)
+    rho = sigma ** 2 * tuned_count / (log_term + math.log(log_term + 1))
+    variance = sigma ** 2 * count
+    return math.sqrt((variance + rho) * math.log((variance + rho) / (rho * (alpha / 2) ** 2))) / count
+
+
+class SequentialMonitor:
+    """Anytime-valid stopping rules for a run, checked after every finished game.
+
+    - Card test: the Bayes factor of a Dirichlet(`prior`) mixture over the rank
+      distribution of the fresh draws against the uniform deck. Under a uniform
+      dealer it is a nonnegative martingale, so by Ville's inequality stopping
+      when it reaches 1/alpha wrongly flags a fair dealer with probability at
+      most alpha, however often it is checked ("cards diverge from uniform").
+      The other way out is precision: once every rank's confidence sequence
+      (at alpha / 13 each, so all hold at once) lies within `card_precision`
+      percentage points of 1/13, any bias is known to be smaller than that.
+    - Win rate precision: with `win_rate_precision` (percentage points), stop
+      once the 1 - alpha confidence sequence for the player win rate is that
+      narrow on each side.
+
+    Nothing stops before `min_games` games.
+    """
+
+    def __init__(self, alpha=0.05, min_games=50, card_test=True, card_precision=3.0, win_rate_precision=None,
+                 prior=0.5):
+        self.alpha = alpha
+        self.min_games = min_games
+        self.card_test = card_test
+        self.card_precision = card_precision
+        self.win_rate_precision = win_rate_precision
+        self.prior = prior
+        self.card_counts = [0] * len(valid_cards)
+        self.draws = 0
+        self.games = 0
+        self.wins = 0
+        self.stop_reason = None
+        self.games_at_stop = None
+
+    @property
+    def stopped(self):
+        return self.stop_reason is not None
+
+    def observe(self, cards, winner):
+        """Add one finished game: its freshly drawn cards and its winner."""
+        for card in cards:
+            self.card_counts[card_codes[card]] += 1
+        self.draws += len(cards)
+        self.games += 1
+        self.wins += winner == "Player"
+        if not self.stopped and self.games >= self.min_games:
+            self.check()
+
+    def log_bayes_factor(self):
+        """Log Bayes factor of the Dirichlet mixture over the uniform deck for the draws so far."""
+        bins = len(self.card_counts)
+        log_mixture = (math.lgamma(bins * self.prior) - math.lgamma(bins * self.prior + self.draws)
+                       + sum(math.lgamma(self.prior + count) - math.lgamma(self.prior) for count in self.card_counts))
+        return log_mixture + self.draws * math.log(bins)
+
+    def rank_intervals(self):
+        """Always-valid intervals of every rank's share of the fresh draws, in percent, jointly at 1 - alpha."""
+        radius = normal_mixture_radius(self.draws, self.alpha / len(self.card_counts), tuned_count=5000)
+        rates = [count / max(self.draws, 1) for count in self.card_counts]
+        return {valid_cards[code]: [max(0.0, rate - radius) * 100, min(1.0, rate + radius) * 100]
+                for code, rate in enumerate(rates)}
+
+    def win_rate_interval(self):
+        """Always-valid 1 - alpha interval for the player win rate, in percent."""
+        if not self.games:
+            return [0.0, 100.0]
+        rate = self.wins / self.games
+        radius = normal_mixture_radius(self.games, self.alpha)
+        return [max(0.0, rate - radius) * 100, min(1.0, rate + radius) * 100]
+
+    def check(self):
+        reason = None
+        if self.card_test:
+            log_bayes_factor = self.log_bayes_factor()
+            uniform = 100 / len(self.card_counts)
+            if log_bayes_factor >= -math.log(self.alpha):
+                reason = "cards diverge from uniform"
+            elif all(uniform - self.card_precision <= low and high <= uniform + self.card_precision
+                     for low, high in self.rank_intervals().values()):
+                reason = f"cards within {self.card_precision:g} points of uniform"
+        if reason is None and self.win_rate_precision is not None:
+            low, high = self.win_rate_interval()
+            if (high - low) / 2 <= self.win_rate_precision:
+                reason = "win rate precision reached"
+        if reason is not None:
+            self.stop_reason = reason
+            self.games_at_stop = self.games
+
+    def to_dict(self, games_played):
+        """The run's sequential-testing record for the results file."""
+        return {
+            "stop_reason": self.stop_reason or "game limit reached",
+            "games_at_decision": self.games_at_stop,
+            # Games in flight when the run stopped still finish and count
+            "effective_sample_size": games_played,
+            "card_draws_tested": self.draws,
+            "alpha": self.alpha,
+            "min_games": self.min_games,
+            "log_bayes_factor": self.log_bayes_factor() if self.card_test else None,
+            "card_precision": self.card_precision if self.card_test else None,
+            "rank_intervals": self.rank_intervals(),
+            "win_rate_interval": self.win_rate_interval(),
+            "win_rate_precision": self.win_rate_precision,
+        }
+
+    def __str__(self):
+        if not self.stopped:
+            return f"Sequential test: no decision after {self.games} games"
+        return f"Sequential test: {self.stop_reason} after {self.games_at_stop} games"
@@ -0,0 +1,80 @@
+import random
+from collections import Counter, defaultdict
+from cards import card_codes, Hand
+
+
+def hand_summary(cards, by_totals=False):
+    """Order-free summary of a hand: its sorted cards, or (value, soft flag) with `by_totals`."""
+    if by_totals:
+        hand = cards if isinstance(cards, Hand) else Hand(cards)
+        return hand.value, hand.soft_aces > 0
+    return tuple(sorted(cards, key=card_codes.__getitem__))
+
+
+def canonical_state_key(game_state, by_totals=False):
+    """Reduce a draw's `game_state` dict to a compact hashable key.
+
+    The key is (role, dealer hand, player hand, dealer upcard) with each hand
+    reduced by hand_summary, so states that only differ in card order, wording
+    or prompt-only fields such as "description" share a key. Setup draws have no
+    upcard until the dealer's hand is dealt.
+    """
+    dealer_hand = game_state.get("dealer_hand") or []
+    player_hand = game_state.get("player_hand") or []
+    upcard = game_state.get("dealer_upcard")
+    if upcard is None and len(dealer_hand):
+        upcard = dealer_hand[0]
+    return (game_state.get("role"), hand_summary(dealer_hand, by_totals), hand_summary(player_hand, by_totals), upcard)
+
+
+def format_state_key(key):
+    """Readable string form of a state key, e.g. 'Player|dealer=10,King|player=5,9|upcard=10'."""
+    role, dealer, player, upcard = key
+    def hand(summary):
+        if summary and isinstance(summary[0], int):
+            return f"{summary[0]}{' soft' if summary[1] else ''}"
+        return ",".join(summary)
+    return f"{role}|dealer={hand(dealer)}|player={hand(player)}|upcard={upcard or '-'}"
+
+
+class DrawIndex:
+    """In-memory index of the cards drawn for each canonical state key.
+
+    Lets a driver look up, pool or resample what the model drew in a state it
+    has already seen, and gives per-state draw counts for analysis.
+    """
+
+    def __init__(self):
+        self.counts = defaultdict(Counter)
+
+    def observe(self, key, card):
+        self.counts[key][card] += 1
+
+    def draws(self, key):
+        """Card -> count of the draws observed for `key` (empty if none)."""
+        return self.counts.get(key, Counter())
+
+    def total(self, key):
+        return sum(self.draws(key).values())
+
+    def distribution(self, key):
+        """Empirical card -> probability for `key`, or None if the state has not been seen."""
+        draws = self.draws(key)
+        total = sum(draws.values())
+        if not total:
+            return None
+        return {card: count / total for card, count in draws.items()}
+
+    def sample(self, key, rng=random):
+        """Resample one card from the draws pooled for `key`, or None if there are none."""
+        draws = self.draws(key)
+        if not draws:
+            return None
+        return rng.choices(list(draws), weights=list(draws.values()))[0]
+
+    def __len__(self):
+        return len(self.counts)
+
+    def to_dict(self):
+        """Per-state draw counts keyed by format_state_key, for the results file."""
+        return {format_state_key(key): dict(draws) for key, draws in self.counts.items()}
@@ -0,0 +1,229 @@
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import time
+from dealer_engine import backend_names, llm_backends, build_engine, draw_modes, open_game_log, results_filename, \
+    save_results, script_outputs, sequential_monitor
+from draw_cache import open_draw_cache
+from ollama_residency import OllamaResidency, group_by_model
+
+# Requests in flight at once per provider, shared by every run of that provider in the sweep
+default_provider_concurrency = {"anthropic": 16, "openai": 32, "ollama": 4, "random": 64, "replay": 64}
+
+default_config = {
+    "models": [],
+    "temperatures": [0.5],
+    "shot_types": ["zero"],
+    "dealers": ["honest"],
+    "games": 1000,
+    "provider_concurrency": {},
+    "draw_mode": "",
+    "cache_mode": "",
+    "constrained": False,
+    "pool_after": 0,
+    "output_dir": ".",
+    # Local models loaded at once, and optionally the GB of model weights they may take
+    "ollama_max_resident": 1,
+    "ollama_memory_gb": None,
+    # Continue each cell from its game log instead of starting over
+    "resume": False,
+    # Write per-game final hand value lists next to the histograms
+    "per_game_values": False,
+    # Stop a cell early once its card test is settled at this level (or every rank is known within
+    # card_precision points), or its win rate is known within this many percentage points;
+    # no cell stops before min_games games
+    "stop_alpha": None,
+    "card_precision": 3.0,
+    "win_rate_precision": None,
+    "min_games": 50,
+}
+
+
+def parse_model(spec):
+    """Split a 'provider=model' spec, e.g. 'ollama=llama3.1:8b', into (provider, model)."""
+    provider, separator, model = spec.partition("=")
+    if not separator or provider not in backend_names:
+        raise ValueError(f"Model {spec!r} must look like provider=model, with provider one of {', '.join(backend_names)}")
+    return provider, model
+
+
+def expand_matrix(config):
+    """Every (provider, model, temperature, shot type, dealer) cell of the sweep, in a stable order."""
+    models = [parse_model(spec) for spec in config["models"]]
+    return [{"provider": provider, "model": model, "temperature": float(temperature), "shot_type": shot_type,
+             "dealer": dealer}
+            for (provider, model), temperature, shot_type, dealer in itertools.product(
+                models, config["temperatures"], config["shot_types"], config["dealers"])]
+
+
+def cell_name(cell):
+    return f"{cell['provider']}:{cell['model']} {cell['dealer']} {cell['shot_type']}-shot t={cell['temperature']}"
+
+
+async def run_cell(cell, config, request_slots, draw_cache):
+    """Play one cell's games and write its results file; returns (path, results).
+
+    Finished games go to a game log next to the results file. A cell cancelled
+    by Ctrl-C still writes the results of its finished games, marked partial.
+    """
+    provider = cell["provider"]
+    setup_descriptions = script_outputs.get((provider, cell["dealer"]), (None, False))[1]
+    # A replay cell is named after the results file it replays
+    llm_name = os.path.splitext(os.path.basename(cell["model"]))[0] if provider == "replay" else cell["model"]
+    path = os.path.join(config["output_dir"], results_filename(provider, cell["dealer"], llm_name,
+                                                               cell["temperature"], cell["shot_type"]))
+    game_log = open_game_log(path, provider, cell["model"], cell["temperature"], cell["shot_type"], cell["dealer"],
+                             config["draw_mode"], config["pool_after"], config["resume"])
+    try:
+        engine = build_engine(provider, cell["model"], cell["temperature"], cell["shot_type"], cell["dealer"],
+                              concurrency=config["provider_concurrency"][provider], draw_mode=config["draw_mode"],
+                              draw_cache=draw_cache, constrained=config["constrained"], pool_after=config["pool_after"],
+                              setup_descriptions=setup_descriptions,
+                              replay_file=cell["model"] if provider == "replay" else None,
+                              request_slots=request_slots[provider], verbose=False, game_log=game_log,
+                              per_game_values=config["per_game_values"],
+                              monitor=sequential_monitor(config["stop_alpha"], config["win_rate_precision"],
+                                                         config["min_games"], config["card_precision"]))
+        try:
+            await engine.play(config["games"], desc=cell_name(cell))
+        except asyncio.CancelledError:
+            engine.interrupted = True
+            save_results(engine.results(llm_name, cell["shot_type"], cell["temperature"]), path)
+            raise
+    finally:
+        game_log.close()
+    results = engine.results(llm_name, cell["shot_type"], cell["temperature"])
+    save_results(results, path)
+    return path, results
+
+
+async def run_sweep(cells, config):
+    """Run the cells concurrently; each provider's requests share one concurrency budget.
+
+    Ollama cells are the exception: they run grouped by model, one model at a
+    time, under OllamaResidency, so the local server is not made to swap models
+    back and forth. Returns each cell's (path, results), or its exception.
+    """
+    request_slots = {provider: asyncio.Semaphore(budget) for provider, budget in config["provider_concurrency"].items()}
+    # Disk cache of raw responses, shared by all cells so their writes go through one connection
+    draw_cache = open_draw_cache(config["cache_mode"])
+    outcomes = [None] * len(cells)
+
+    async def run_indexed(index):
+        try:
+            outcomes[index] = await run_cell(cells[index], config, request_slots, draw_cache)
+        except Exception as error:
+            outcomes[index] = error
+
+    ollama_cells = [index for index, cell in enumerate(cells) if cell["provider"] == "ollama"]
+    groups = [(model, [lambda index=index: run_indexed(index) for index in indices])
+              for model, indices in group_by_model(ollama_cells, lambda index: cells[index]["model"])]
+    runs = [run_indexed(index) for index, cell in enumerate(cells) if cell["provider"] != "ollama"]
+    if groups:
+        residency = OllamaResidency(config["ollama_max_resident"], config["ollama_memory_gb"])
+        runs.append(residency.run(groups))
+    await asyncio.gather(*runs)
+    if draw_cache is not None:
+        print(f"Draw cache: {draw_cache.hits} responses reused, {draw_cache.misses} requested")
+    return outcomes
+
+
+def load_config(path):
+    config = dict(default_config)
+    if path:
+        with open(path) as file:
+            config.update(json.load(file))
+    return config
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Run a matrix of model x temperature x shot type x dealer experiments concurrently.",
+        epilog="Settings come from --config (a JSON file with the keys of default_config) and are "
+               "overridden by the flags below.")
+    parser.add_argument("--config", help="JSON sweep configuration file.")
+    parser.add_argument("--models", nargs="+", help="provider=model specs, e.g. anthropic=claude-3-5-haiku-20241022 "
+                                                    "ollama=llama3.1:8b (replay=<results file> for the replay backend).")
+    parser.add_argument("--temperatures", nargs="+", type=float)
+    parser.add_argument("--shot-types", nargs="+", choices=("zero", "few"))
+    parser.add_argument("--dealers", nargs="+", choices=("honest", "deceptive"))
+    parser.add_argument("--games", type=int, help="Games per cell.")
+    parser.add_argument("--concurrency", nargs="+", default=[], metavar="PROVIDER=N",
+                        help="Requests in flight at once per provider, e.g. openai=64 ollama=2.")
+    parser.add_argument("--draw-mode", help="Draw mode for every cell: 'wave', 'batch', 'local-batch' or 'logprobs'.")
+    parser.add_argument("--cache-mode", help="Draw cache mode: 'record', 'replay' or 'cache-first'.")
+    parser.add_argument("--constrained", action="store_true", default=None, help="Constrain answers to the 13 cards.")
+    parser.add_argument("--pool-after", type=int)
+    parser.add_argument("--output-dir", help="Directory for the results files.")
+    parser.add_argument("--ollama-max-resident", type=int, help="Local models Ollama may keep loaded at once.")
+    parser.add_argument("--ollama-memory-gb", type=float, help="GB of model weights Ollama may keep loaded at once.")
+    parser.add_argument("--resume", action="store_true", default=None,
+                        help="Continue each cell from its game log, e.g. after an interrupted sweep.")
+    parser.add_argument("--per-game-values", action="store_true", default=None,
+                        help="Also write the per-game final hand value lists.")
+    parser.add_argument("--stop-alpha", type=float,
+                        help="Stop each cell once its sequential card test is settled at this significance level.")
+    parser.add_argument("--win-rate-precision", type=float,
+                        help="Stop each cell once its win rate is known within this many percentage points.")
+    parser.add_argument("--card-precision", type=float,
+                        help="With --stop-alpha, also stop once every rank is within this many points of uniform.")
+    parser.add_argument("--min-games", type=int, help="Games per cell before any early stop.")
+    parser.add_argument("--dry-run", action="store_true", help="List the cells without running them.")
+    args = parser.parse_args()
+
+    config = load_config(args.config)
+    for key in ("models", "temperatures", "shot_types", "dealers", "games", "draw_mode", "cache_mode",
+                "constrained", "pool_after", "output_dir", "ollama_max_resident", "ollama_memory_gb", "resume",
+                "per_game_values", "stop_alpha", "card_precision", "win_rate_precision",
+                "min_games"):
+        if getattr(args, key) is not None:
+            config[key] = getattr(args, key)
+    config["provider_concurrency"] = dict(default_provider_concurrency, **config["provider_concurrency"])
+    for spec in args.concurrency:
+        provider, _, budget = spec.partition("=")
+        if provider not in backend_names or not budget.isdigit() or int(budget) <= 0:
+            parser.error(f"--concurrency {spec!r} must look like provider=N with N > 0")
+        config["provider_concurrency"][provider] = int(budget)
+    try:
+        cells = expand_matrix(config)
+    except ValueError as error:
+        parser.error(str(error))
+    if not cells:
+        parser.error("The sweep has no cells; give at least one model with --models or in the config file")
+    if config["games"] <= 0:
+        parser.error("games must be positive")
+    try:
+        sequential_monitor(config["stop_alpha"], config["win_rate_precision"], config["min_games"],
+                           config["card_precision"])
+    except ValueError as error:
+        parser.error(str(error))
+    for provider in {cell["provider"] for cell in cells}:
+        if config["draw_mode"] and provider in llm_backends and config["draw_mode"] not in draw_modes(llm_backends[provider]):
+            parser.error(f"The {provider} backend does not support draw mode {config['draw_mode']!r}")
+
+    for cell in cells:
+        print(cell_name(cell))
+    print(f"{len(cells)} cells, {config['games']} games each")
+    if args.dry_run:
+        raise SystemExit
+
+    os.makedirs(config["output_dir"], exist_ok=True)
+    start = time.perf_counter()
+    try:
+        outcomes = asyncio.run(run_sweep(cells, config))
+    except KeyboardInterrupt:
+        print("\nSweep interrupted; the running cells wrote partial results. Run again with --resume to finish.")
+        raise SystemExit(1)
+    print(f"\nSweep finished in {time.perf_counter() - start:.1f} s")
+    for cell, outcome in zip(cells, outcomes):
+        if isinstance(outcome, BaseException):
+            print(f"{cell_name(cell)}: failed ({type(outcome).__name__}: {outcome})")
+            continue
+        path, results = outcome
+        metrics = results["metrics"]
+        sequential = results.get("sequential")
+        stop = f" ({sequential['stop_reason']}, {sequential['effective_sample_size']} games)" if sequential else ""
+        print(f"{cell_name(cell)}: player win rate {metrics['player_win_rate']:.3f}%, "
+              f"dealer bust rate {metrics['dealer_bust_rate']:.3f}%{stop} -> {path}")
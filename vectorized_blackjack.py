@@ -0,0 +1,298 @@
+import argparse
+import json
+import multiprocessing
+import os
+import time
+import numpy as np
+from cards import valid_cards, card_codes, card_values, ace_code, hit_upcards
+from aggregators import GameAggregate, RunningStats, hand_value_bins
+from game_records import GameRecordWriter, games_to_records, no_card
+from results_catalog import catalog_results
+
+# Lookup tables indexed by rank code
+value_table = np.array(card_values, dtype=np.int16)
+hit_upcard_codes = np.array([card_codes[card] for card in hit_upcards], dtype=np.uint8)
+
+
+def draw_cards(rng, size, probs=None):
+    """Draw `size` rank codes, uniformly or from a 13-entry probability vector."""
+    if probs is None:
+        return rng.integers(0, len(valid_cards), size=size, dtype=np.uint8)
+    return rng.choice(len(valid_cards), size=size, p=probs).astype(np.uint8)
+
+
+def add_cards(total, soft, codes):
+    """Add one card per hand to the running (total, soft ace count) arrays in place."""
+    total += value_table[codes]
+    soft += codes == ace_code
+    # Convert Aces from 11 to 1 while a hand is over 21 (at most twice per added card)
+    over = (total > 21) & (soft > 0)
+    while over.any():
+        total[over] -= 10
+        soft[over] -= 1
+        over = (total > 21) & (soft > 0)
+
+
+def simulate_games(num_games, rng=None, player_probs=None, dealer_probs=None, hand_cards=0):
+    """Play `num_games` games in lockstep draw rounds and return per-game arrays.
+
+    Each round draws one card for every game that is still hitting, so the number
+    of Python-level iterations depends on the longest hand, not on `num_games`.
+    With `hand_cards`, the rank codes of each hand's first `hand_cards` cards are
+    also returned, as "player_cards" and "dealer_cards" (no_card in empty slots).
+    """
+    if rng is None:
+        rng = np.random.default_rng()
+    player_rank_counts = np.zeros(len(valid_cards), dtype=np.int64)
+    dealer_rank_counts = np.zeros(len(valid_cards), dtype=np.int64)
+
+    # Deal the initial hands, dealer first as in run_single_game
+    dealer_cards = draw_cards(rng, (num_games, 2), dealer_probs)
+    player_cards = draw_cards(rng, (num_games, 2), player_probs)
+    dealer_rank_counts += np.bincount(dealer_cards.ravel(), minlength=len(valid_cards))
+    player_rank_counts += np.bincount(player_cards.ravel(), minlength=len(valid_cards))
+    dealer_upcard = dealer_cards[:, 0]
+
+    player_total = np.zeros(num_games, dtype=np.int16)
+    player_soft = np.zeros(num_games, dtype=np.int16)
+    dealer_total = np.zeros(num_games, dtype=np.int16)
+    dealer_soft = np.zeros(num_games, dtype=np.int16)
+    for column in range(2):
+        add_cards(player_total, player_soft, player_cards[:, column])
+        add_cards(dealer_total, dealer_soft, dealer_cards[:, column])
+    dealer_has_ace = (dealer_cards == ace_code).any(axis=1)
+    player_draws = np.full(num_games, 2, dtype=np.uint8)
+    dealer_draws = np.full(num_games, 2, dtype=np.uint8)
+    if hand_cards:
+        player_hands = np.full((num_games, max(hand_cards, 2)), no_card, dtype=np.uint8)
+        dealer_hands = np.full((num_games, max(hand_cards, 2)), no_card, dtype=np.uint8)
+        player_hands[:, :2] = player_cards
+        dealer_hands[:, :2] = dealer_cards
+
+    # Player rounds: keep hitting below 17 against a ten-valued upcard.
+    # The `dealer_upcard in range(2, 7)` branch of player_strategy compares a card
+    # name to ints and never fires, so it is not reproduced here.
+    active = np.flatnonzero(np.isin(dealer_upcard, hit_upcard_codes) & (player_total < 17))
+    while active.size:
+        codes = draw_cards(rng, active.size, player_probs)
+        player_rank_counts += np.bincount(codes, minlength=len(valid_cards))
+        if hand_cards:
+            keep = player_draws[active] < hand_cards
+            player_hands[active[keep], player_draws[active[keep]]] = codes[keep]
+        total, soft = player_total[active], player_soft[active]
+        add_cards(total, soft, codes)
+        player_total[active], player_soft[active] = total, soft
+        player_draws[active] += 1
+        active = active[total < 17]
+
+    # Dealer rounds: only when the player did not bust; hit below 17 and on 17 with an Ace
+    def dealer_hits(index):
+        total = dealer_total[index]
+        return (total < 17) | ((total == 17) & dealer_has_ace[index])
+
+    active = np.flatnonzero(player_total <= 21)
+    active = active[dealer_hits(active)]
+    while active.size:
+        codes = draw_cards(rng, active.size, dealer_probs)
+        dealer_rank_counts += np.bincount(codes, minlength=len(valid_cards))
+        if hand_cards:
+            keep = dealer_draws[active] < hand_cards
+            dealer_hands[active[keep], dealer_draws[active[keep]]] = codes[keep]
+        total, soft = dealer_total[active], dealer_soft[active]
+        add_cards(total, soft, codes)
+        dealer_total[active], dealer_soft[active] = total, soft
+        dealer_has_ace[active] |= codes == ace_code
+        dealer_draws[active] += 1
+        active = active[dealer_hits(active)]
+
+    # Outcome per game: 1 = player wins, -1 = dealer wins, 0 = tie (same order as declare_winner)
+    player_busted = player_total > 21
+    dealer_busted = dealer_total > 21
+    outcome = np.sign(player_total - dealer_total).astype(np.int8)
+    outcome[dealer_busted] = 1
+    outcome[player_busted] = -1
+
+    games = {
+        "player_final_hand_values": player_total,
+        "dealer_final_hand_values": dealer_total,
+        "dealer_busted": dealer_busted,
+        "outcome": outcome,
+        "player_draws": player_draws,
+        "dealer_draws": dealer_draws,
+        "player_rank_counts": player_rank_counts,
+        "dealer_rank_counts": dealer_rank_counts,
+    }
+    if hand_cards:
+        games["player_cards"] = player_hands
+        games["dealer_cards"] = dealer_hands
+    return games
+
+
+# Keys of the per-game arrays in a simulate_games result (the rest are run totals)
+per_game_columns = ("player_final_hand_values", "dealer_final_hand_values", "dealer_busted", "outcome",
+                    "player_draws", "dealer_draws", "player_cards", "dealer_cards")
+
+
+def summarize_games(games):
+    """Reduce per-game arrays to a compact aggregate of counts that can be merged across shards."""
+    outcome = games["outcome"]
+    return {
+        "num_games": int(outcome.size),
+        "win_record": np.array([np.count_nonzero(outcome == 1),
+                                np.count_nonzero(outcome == -1),
+                                np.count_nonzero(outcome == 0)], dtype=np.int64),
+        "dealer_busts": int(np.count_nonzero(games["dealer_busted"])),
+        "player_rank_counts": games["player_rank_counts"],
+        "dealer_rank_counts": games["dealer_rank_counts"],
+        "player_value_counts": np.bincount(games["player_final_hand_values"], minlength=hand_value_bins),
+        "dealer_value_counts": np.bincount(games["dealer_final_hand_values"], minlength=hand_value_bins),
+    }
+
+
+def merge_aggregates(aggregates):
+    """Sum partial aggregates (from summarize_games) into a single aggregate."""
+    merged = None
+    for aggregate in aggregates:
+        if merged is None:
+            merged = dict(aggregate)
+        else:
+            merged = {key: merged[key] + value for key, value in aggregate.items()}
+    return merged
+
+
+def simulate_shard(shard):
+    """Process-pool worker: simulate one (num_games, SeedSequence, keep_values, record_cards) shard.
+
+    Returns the shard's aggregate, its per-game final hand value arrays when
+    `keep_values` is set and its game records, with `record_cards` card slots
+    per hand, when that is non-zero (otherwise None for each).
+    """
+    num_games, seed_sequence, keep_values, record_cards = shard
+    games = simulate_games(num_games, np.random.default_rng(seed_sequence), hand_cards=record_cards)
+    values = None
+    if keep_values:
+        values = (games["player_final_hand_values"], games["dealer_final_hand_values"])
+    records = games_to_records(games, record_cards) if record_cards else None
+    return summarize_games(games), values, records
+
+
+def run_sharded(num_games, workers=None, seed=None, shard_size=1_000_000, per_game_values=False,
+                records_writer=None):
+    """Split `num_games` across a process pool and merge the workers' aggregates.
+
+    Every shard gets its own child of one SeedSequence, so the streams are
+    independent and a fixed seed reproduces the run for the same shard layout.
+    Shards are capped at `shard_size` games to bound each worker's memory.
+    Returns the merged aggregate and, with `per_game_values`, the concatenated
+    (player, dealer) final hand value arrays in shard completion order. With a
+    `records_writer` (a GameRecordWriter), each shard's game records are
+    written to it as the shard completes.
+    """
+    workers = workers or os.cpu_count()
+    num_shards = min(num_games, max(workers, -(-num_games // shard_size)))
+    sizes = [num_games // num_shards + (index < num_games % num_shards) for index in range(num_shards)]
+    streams = np.random.SeedSequence(seed).spawn(num_shards)
+    aggregates = []
+    player_values, dealer_values = [], []
+    record_cards = records_writer.dtype["player_cards"].shape[0] if records_writer is not None else 0
+    with multiprocessing.Pool(workers) as pool:
+        shards = zip(sizes, streams, [per_game_values] * num_shards, [record_cards] * num_shards)
+        for aggregate, values, records in pool.imap_unordered(simulate_shard, shards):
+            aggregates.append(aggregate)
+            if records is not None:
+                records_writer.write(records)
+            if values is not None:
+                player_values.append(values[0])
+                dealer_values.append(values[1])
+    values = None
+    if per_game_values:
+        values = (np.concatenate(player_values), np.concatenate(dealer_values))
+    return merge_aggregates(aggregates), values
+
+
+def to_game_aggregate(aggregate):
+    """Convert an array aggregate (from summarize_games) into a GameAggregate."""
+    game_aggregate = GameAggregate()
+    game_aggregate.num_games = aggregate["num_games"]
+    game_aggregate.win_record = dict(zip(["Player", "Dealer", "Tie"], aggregate["win_record"].tolist()))
+    game_aggregate.dealer_busts = aggregate["dealer_busts"]
+    game_aggregate.player_cards.counts = aggregate["player_rank_counts"].tolist()
+    game_aggregate.dealer_cards.counts = aggregate["dealer_rank_counts"].tolist()
+    game_aggregate.player_values.counts = aggregate["player_value_counts"].tolist()
+    game_aggregate.dealer_values.counts = aggregate["dealer_value_counts"].tolist()
+    game_aggregate.player_value_stats = RunningStats.from_histogram(game_aggregate.player_values)
+    game_aggregate.dealer_value_stats = RunningStats.from_histogram(game_aggregate.dealer_values)
+    return game_aggregate
+
+
+def build_results(aggregate, player_final_hand_values=None, dealer_final_hand_values=None):
+    """Build a results dict with the schema of random_blackjack_results.json.
+
+    Final hand values are always written as value -> count histograms; the
+    per-game lists are only included when the value arrays are passed in.
+    """
+    if player_final_hand_values is not None:
+        player_final_hand_values = player_final_hand_values.tolist()
+    if dealer_final_hand_values is not None:
+        dealer_final_hand_values = dealer_final_hand_values.tolist()
+    return to_game_aggregate(aggregate).to_results(player_final_hand_values, dealer_final_hand_values)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Vectorized random-baseline blackjack simulation.")
+    parser.add_argument("--games", type=int, default=1_000_000, help="Number of games to simulate.")
+    parser.add_argument("--seed", type=int, default=None, help="Seed for the NumPy random generator.")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Worker processes; above 1 the games are sharded across a process pool "
+                             "(0 uses every core).")
+    parser.add_argument("--per-game-values", action="store_true",
+                        help="Also write the per-game player/dealer_final_hand_values lists "
+                             "(large for big runs; the histograms are always written).")
+    parser.add_argument("--output", default="random_blackjack_results.json", help="Results file to write.")
+    parser.add_argument("--records", help="Also write every game to this binary records file (see game_records.py); "
+                                          "gzip-compressed when the name ends in .gz.")
+    parser.add_argument("--record-cards", type=int, default=12, help="Card slots per hand in the records file.")
+    args = parser.parse_args()
+    if args.games <= 0:
+        parser.error("--games must be a positive number of games")
+    if args.workers < 0:
+        parser.error("--workers must be 0 (every core) or a positive number of processes")
+    if not 2 <= args.record_cards <= 64:
+        parser.error("--record-cards must be between 2 and 64")
+
+    start = time.perf_counter()
+    values = None
+    records_writer = None
+    if args.records:
+        records_writer = GameRecordWriter(args.records, args.record_cards, compress=args.records.endswith(".gz"))
+    if args.workers == 1:
+        games = simulate_games(args.games, np.random.default_rng(args.seed),
+                               hand_cards=args.record_cards if records_writer else 0)
+        aggregate = summarize_games(games)
+        if args.per_game_values:
+            values = (games["player_final_hand_values"], games["dealer_final_hand_values"])
+        if records_writer is not None:
+            # Packed and written a million rows at a time to bound the extra memory
+            for chunk in range(0, args.games, 1_000_000):
+                rows = {key: games[key][chunk:chunk + 1_000_000] for key in per_game_columns}
+                records_writer.write(games_to_records(rows, args.record_cards))
+    else:
+        aggregate, values = run_sharded(args.games, args.workers or None, args.seed,
+                                        per_game_values=args.per_game_values, records_writer=records_writer)
+    if records_writer is not None:
+        records_writer.close()
+    results = build_results(aggregate, *(values or ()))
+    with open(args.output, "w") as file:
+        json.dump(results, file)
+    catalog_results(args.output, results)
+    # Throughput covers everything up to the results file being written
+    elapsed = time.perf_counter() - start
+    metrics = results["metrics"]
+
+    print(f"Simulated {args.games} games in {elapsed:.2f}s ({args.games / elapsed:,.0f} games/s)")
+    if args.records:
+        print(f"Game records written to {args.records}")
+    print(f"Randomized Blackjack - Player Win Rate: {metrics['player_win_rate']:.3f}%")
+    print(f"Randomized Blackjack - Dealer Bust Rate: {metrics['dealer_bust_rate']:.3f}%")
+    print(f"Randomized Blackjack - Average Player Hand Value: {metrics['average_player_hand_value']:.2f}")
+    print(f"Randomized Blackjack - Average Dealer Hand Value: {metrics['average_dealer_hand_value']:.2f}")
@@ -0,0 +1,69 @@
+import asyncio
+
+
+def gather_wave(draw):
+    """Wave function that sends every draw of a wave as its own concurrent `draw(game_state)` call."""
+    async def draw_wave(game_states):
+        return await asyncio.gather(*(draw(game_state) for game_state in game_states), return_exceptions=True)
+    return draw_wave
+
+
+class WaveScheduler:
+    """Advance many games in lockstep, issuing their pending draws together as one wave.
+
+    Games call `draw(game_state)` in place of querying the LLM directly and are
+    suspended until the next wave. A wave is sent once every running game is
+    waiting on a draw (setup, player hit or dealer hit), so a run costs about as
+    many round trips as the longest game has draws rather than one per draw.
+    `draw_wave(game_states)` returns one card, or exception, per game state.
+    """
+
+    def __init__(self, draw_wave):
+        self.draw_wave = draw_wave
+        self.pending = []
+        self.active_games = 0
+        self.waves = 0
+        self.draws = 0
+        self.check_scheduled = False
+
+    async def draw(self, game_state):
+        """Queue one draw for the next wave and wait for its card."""
+        future = asyncio.get_running_loop().create_future()
+        self.pending.append((game_state, future))
+        self.schedule_check()
+        return await future
+
+    def game_started(self):
+        self.active_games += 1
+
+    def game_finished(self):
+        self.active_games -= 1
+        self.schedule_check()
+
+    def schedule_check(self):
+        # Checking on the next loop iteration lets a worker that just finished a
+        # game start its next one (and queue its first draw) before the wave goes out
+        if not self.check_scheduled:
+            self.check_scheduled = True
+            asyncio.get_running_loop().call_soon(self.check)
+
+    def check(self):
+        self.check_scheduled = False
+        if self.pending and len(self.pending) >= self.active_games:
+            wave, self.pending = self.pending, []
+            asyncio.get_running_loop().create_task(self.send(wave))
+
+    async def send(self, wave):
+        self.waves += 1
+        self.draws += len(wave)
+        try:
+            cards = await self.draw_wave([game_state for game_state, _ in wave])
+        except Exception as error:
+            cards = [error] * len(wave)
+        for (_, future), card in zip(wave, cards):
+            if future.done():
+                continue
+            if isinstance(card, BaseException):
+                future.set_exception(card)
+            else:
+                future.set_result(card)